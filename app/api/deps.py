@@ -2,40 +2,84 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
-from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM
-from app.db.session import get_db
+from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM, AUTH_STATELESS
+from app.db.session import DbSession, get_db
 from app.models.user import User
-from app.models.permission import Permission
+from app.core.permission_table import cached_permission_table, reload_permission_table
+from app.core.principal import Principal, cached_security_version, load_security_version
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def _load_user(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
+
+async def _principal(payload: dict, db: DbSession) -> Principal:
+    hit, version = cached_security_version(payload["uid"])
+    if not hit:
+        version = await db.run_sync(load_security_version, payload["uid"])
+    if version != payload.get("sv"):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return Principal(
+        id=payload["uid"],
+        username=payload["sub"],
+        role=payload["role"],
+        group_ids=frozenset(payload.get("gids", ())),
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_db)) -> User | Principal:
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         username = payload.get("sub")
-        if not username:
+        if not username or payload.get("typ") == "refresh":
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = db.query(User).filter(User.username == username).first()
+        if AUTH_STATELESS and "uid" in payload:
+            return await _principal(payload, db)
+        user = await db.run_sync(_load_user, username)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
-def permission_required(endpoint_name: str):
-    def wrapper(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
-        # superadmin bypass
-        if current_user.role == "superadmin":
-            return current_user
+async def get_token_principal(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_db)) -> Principal:
+    """Caller from the token claims alone, whatever AUTH_STATELESS says.
 
-        perm = db.query(Permission).filter(Permission.endpoint_name == endpoint_name).first()
-        if not perm:
-            raise HTTPException(status_code=404, detail="Permission not configured")
+    For routes hit once per file (media) or polled for cached pages (customer
+    and item lists): revocation is still honoured, but
+    through the security version cache, so the database is read at most once
+    per user every AUTH_VERSION_CACHE_TTL_SECONDS.
+    """
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if not payload.get("sub") or "uid" not in payload or payload.get("typ") == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return await _principal(payload, db)
+
+async def require_admin(curr: User | Principal = Depends(get_current_user)) -> User | Principal:
+    if curr.role in ("admin", "superadmin"):
+        return curr
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
+
+async def check_permission(current_user: User | Principal, endpoint_name: str, db: DbSession) -> None:
+    """Raise unless current_user may call endpoint_name (for checks that depend on the request body)."""
+    # superadmin bypass
+    if current_user.role == "superadmin":
+        return
 
-        allowed_groups = [g.strip() for g in perm.allowed_groups.split(",") if g.strip()]
-        user_groups = [g.name for g in current_user.groups]
+    table = cached_permission_table()
+    if table is None:
+        table = await db.run_sync(reload_permission_table)
+    allowed_groups = table.get(endpoint_name)
+    if allowed_groups is None:
+        raise HTTPException(status_code=404, detail="Permission not configured")
 
-        if not set(allowed_groups).intersection(user_groups):
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    if allowed_groups.isdisjoint(current_user.group_ids):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+def permission_required(endpoint_name: str):
+    async def wrapper(current_user: User | Principal = Depends(get_current_user), db: DbSession = Depends(get_db)) -> User | Principal:
+        await check_permission(current_user, endpoint_name, db)
         return current_user
     return wrapper
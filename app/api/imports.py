@@ -0,0 +1,279 @@
+import asyncio
+import csv
+import io
+import itertools
+import json
+import queue
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from app.core.derivatives import enqueue_derivatives
+from app.db.session import DbSession
+from app.schemas.imports import ImportResult, ImportRowError
+
+# Bulk imports read CSV or NDJSON from the request body as it arrives and
+# load it IMPORT_BATCH_SIZE rows at a time: validate the batch, reject
+# duplicates with one set-based query, insert the rest with multi-row
+# INSERTs, commit. Bad rows are reported by line and never abort a batch.
+
+# (line number, parsed record or None, parse error or None)
+Record = Tuple[int, Optional[dict], Optional[str]]
+# (db, [(line, validated row)]) -> ([(line, reason)] rejected, [row] accepted, [stored blob paths
+# the accepted rows reference]); must not commit
+Loader = Callable[[Session, List[Tuple[int, BaseModel]]], Tuple[List[Tuple[int, str]], List[BaseModel], List[str]]]
+
+def import_format(filename: Optional[str], content_type: Optional[str], fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    raise HTTPException(400, "Unknown import format; pass format=csv or format=ndjson")
+
+def _csv_records(stream: BinaryIO) -> Iterator[Record]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            # empty cells fall back to the schema defaults; "images" holds ;-separated URLs
+            record = {k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+            if "images" in record:
+                record["images"] = [{"image_url": u.strip()} for u in record["images"].split(";") if u.strip()]
+            yield reader.line_num, record, None
+    except UnicodeDecodeError:
+        raise HTTPException(400, "CSV is not valid UTF-8; rows before the error were imported")
+    finally:
+        text.detach()
+
+def _ndjson_records(stream: BinaryIO) -> Iterator[Record]:
+    for line, raw in enumerate(stream, 1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield line, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "Expected a JSON object"
+            continue
+        yield line, record, None
+
+_READERS = {"csv": _csv_records, "ndjson": _ndjson_records}
+
+def _fail(result: ImportResult, line: int, errors: List[str]) -> None:
+    result.failed += 1
+    if len(result.errors) < IMPORT_MAX_ERRORS:
+        result.errors.append(ImportRowError(line=line, errors=errors))
+    else:
+        result.errors_truncated = True
+
+def _validate(batch: List[Record], model: Type[BaseModel], result: ImportResult) -> List[Tuple[int, BaseModel]]:
+    rows = []
+    for line, record, error in batch:
+        if error:
+            _fail(result, line, [error])
+            continue
+        try:
+            rows.append((line, model.model_validate(record)))
+        except ValidationError as e:
+            _fail(result, line, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()])
+    return rows
+
+def _load_batch(
+    db: Session, batch: List[Record], model: Type[BaseModel], load: Loader, result: ImportResult
+) -> List[str]:
+    rows = _validate(batch, model, result)
+    if not rows:
+        return []
+    try:
+        rejected, accepted, blobs = load(db, rows)
+        db.commit()
+    except IntegrityError:
+        # a concurrent writer took a key between our duplicate check and the insert;
+        # the second pass sees its row and rejects ours individually
+        db.rollback()
+        try:
+            rejected, accepted, blobs = load(db, rows)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            rejected, accepted, blobs = [(line, "Conflicts with a concurrent write") for line, _ in rows], [], []
+    for line, reason in rejected:
+        _fail(result, line, [reason])
+    result.inserted += len(accepted)
+    return blobs
+
+# ---- request body ----
+# The handlers read the multipart body themselves instead of having the form
+# parser spool the whole file first. The `file` part's bytes go through a
+# short queue to the record reader on the threadpool, so batches are loaded
+# while the client is still sending, and memory does not grow with the file.
+
+IMPORT_FIELD = "file"
+_QUEUED_CHUNKS = 16  # body chunks buffered ahead of the reader
+
+def import_request_body(description: str) -> dict:
+    """openapi_extra for handlers that call run_import."""
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": [IMPORT_FIELD],
+        "properties": {IMPORT_FIELD: {"type": "string", "format": "binary", "description": description}},
+    }}}}}
+
+class _ImportBody:
+    """python-multipart callbacks that keep the first `file` part's bytes for the reader."""
+
+    def __init__(self, boundary: bytes):
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.found = self.ended = self.reading = False
+        self.chunks: List[bytes] = []
+        self.headers, self.header, self.value = {}, b"", b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header.lower()] = self.value
+        self.header, self.value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if self.found or options.get(b"name") != IMPORT_FIELD.encode() or b"filename" not in options:
+            return  # other fields are read past
+        self.found = self.reading = True
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = self.headers.get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.reading:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        if self.reading:
+            self.reading, self.ended = False, True
+
+    def write(self, chunk: Optional[bytes]) -> None:
+        """Parse the next chunk of the body; None ends it."""
+        try:
+            if chunk is None:
+                self.parser.finalize()
+            else:
+                self.parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(400, "Malformed multipart body")
+
+    def take(self) -> List[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+class _QueueReader(io.RawIOBase):
+    """Blocking file over the chunks the event loop queues: None ends it, an exception is raised."""
+
+    def __init__(self, chunks: queue.Queue):
+        self.chunks = chunks
+        self.buffer = memoryview(b"")
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self.buffer and not self.eof:
+            chunk = self.chunks.get()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buffer = memoryview(chunk)
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+async def _put(chunks: queue.Queue, item) -> None:
+    try:
+        chunks.put_nowait(item)
+    except queue.Full:
+        await run_in_threadpool(chunks.put, item)  # the reader is behind: wait without blocking the loop
+
+async def _feed(stream: AsyncIterator[bytes], body: _ImportBody, chunks: queue.Queue) -> None:
+    try:
+        for data in body.take():
+            await _put(chunks, data)
+        async for chunk in stream:
+            body.write(chunk)
+            for data in body.take():
+                await _put(chunks, data)
+        body.write(None)
+        if not body.ended:
+            raise HTTPException(400, "Multipart body ends inside the file")
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        await _put(chunks, e)  # the reader fails too, rather than loading a cut-off last row
+        raise
+    await _put(chunks, None)
+
+async def run_import(
+    db: DbSession, request: Request, fmt: Optional[str], model: Type[BaseModel], load: Loader
+) -> ImportResult:
+    """Import the `file` part of a multipart request body (format: fmt, else guessed from the part)."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(415, "Expected a multipart/form-data body")
+    body = _ImportBody(params[b"boundary"])
+    stream = request.stream()
+    async for chunk in stream:  # up to the file's headers, which name its format
+        body.write(chunk)
+        if body.found:
+            break
+    if not body.found:
+        raise HTTPException(422, f"No '{IMPORT_FIELD}' file part in the request")
+    fmt = import_format(body.filename, body.content_type, fmt)
+    chunks: queue.Queue = queue.Queue(_QUEUED_CHUNKS)
+    feeder = asyncio.create_task(_feed(stream, body, chunks))
+    records = _READERS[fmt](io.BufferedReader(_QueueReader(chunks)))
+    result = ImportResult()
+    try:
+        # parsing runs on the threadpool, loading through the session; only one batch is in memory
+        while batch := await run_in_threadpool(lambda: list(itertools.islice(records, IMPORT_BATCH_SIZE))):
+            enqueue_derivatives(await db.run_sync(_load_batch, batch, model, load, result))
+        await feeder
+    except BaseException:
+        feeder.cancel()
+        while True:  # unblock a pending put, then end a reader still waiting for data
+            try:
+                chunks.get_nowait()
+            except queue.Empty:
+                break
+        chunks.put_nowait(None)
+        raise
+    result.errors.sort(key=lambda e: e.line)
+    return result
@@ -0,0 +1,99 @@
+from typing import Literal
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.derivatives import derivative_stats
+from app.core.profiling import profiling_stats
+from app.core.refresh_tokens import revocation_stats
+from app.core.response_cache import response_cache_stats
+from app.core.security import password_hasher_stats
+from app.db.metrics import pool_stats, query_stats
+
+router = APIRouter()
+
+@router.get("/derivatives")
+def derivatives():
+    return derivative_stats()
+
+@router.get("/password-hasher")
+def password_hasher():
+    return password_hasher_stats()
+
+@router.get("/response-cache")
+def response_cache():
+    return response_cache_stats()
+
+@router.get("/profiling")
+def profiling():
+    return profiling_stats()
+
+@router.get("/metrics")
+def metrics(format: Literal["json", "prometheus"] = "json"):
+    snapshot = {
+        "db_pools": pool_stats(),
+        "db_queries": query_stats(),
+        "derivatives": derivative_stats(),
+        "password_hasher": password_hasher_stats(),
+        "refresh_tokens": revocation_stats(),
+        "response_cache": response_cache_stats(),
+        "requests": profiling_stats()["routes"],
+    }
+    if format == "prometheus":
+        return PlainTextResponse(_prometheus(snapshot), media_type="text/plain; version=0.0.4")
+    return snapshot
+
+# metric name -> (type, help)
+_POOL_METRICS = {
+    "size": ("gauge", "Configured pool size"),
+    "overflow": ("gauge", "Connections currently open beyond pool_size"),
+    "checked_out": ("gauge", "Connections currently checked out"),
+    "checkouts": ("counter", "Connection checkouts"),
+    "connects": ("counter", "New DBAPI connections opened"),
+    "invalidations": ("counter", "Connections invalidated"),
+    "timeouts": ("counter", "Checkouts that timed out waiting for a connection"),
+    "checkout_wait_seconds": ("counter", "Time spent obtaining connections from the pool"),
+    "max_checkout_wait_seconds": ("gauge", "Longest single checkout wait"),
+}
+_QUERY_METRICS = {
+    "requests": ("counter", "Requests served"),
+    "queries": ("counter", "SQL statements executed"),
+    "query_seconds": ("counter", "Time spent executing SQL statements"),
+    "max_queries_per_request": ("gauge", "Most statements issued by a single request"),
+}
+
+def _prometheus(snapshot: dict) -> str:
+    lines = []
+
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"')
+
+    def family(prefix, metrics, label, rows):
+        for key, (kind, help_) in metrics.items():
+            name = f"{prefix}_{key}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for value_label, row in rows.items():
+                if row.get(key) is not None:
+                    lines.append(f'{name}{{{label}="{escape(value_label)}"}} {row[key]}')
+
+    family("gms_db_pool", _POOL_METRICS, "engine", snapshot["db_pools"])
+    family("gms_db", _QUERY_METRICS, "endpoint", snapshot["db_queries"])
+    for section in ("derivatives", "password_hasher", "refresh_tokens", "response_cache"):
+        for key, value in snapshot[section].items():
+            lines.append(f"# TYPE gms_{section}_{key} gauge")
+            lines.append(f"gms_{section}_{key} {value}")
+    if snapshot["requests"]:
+        lines.append("# HELP gms_request_duration_seconds Request latency (PROFILING_ENABLED)")
+        lines.append("# TYPE gms_request_duration_seconds histogram")
+        for endpoint, row in snapshot["requests"].items():
+            ep = escape(endpoint)
+            for le, count in row["buckets_ms"].items():
+                bound = le if le == "+Inf" else int(le) / 1000
+                lines.append(f'gms_request_duration_seconds_bucket{{endpoint="{ep}",le="{bound}"}} {count}')
+            lines.append(f'gms_request_duration_seconds_sum{{endpoint="{ep}"}} {row["seconds"]}')
+            lines.append(f'gms_request_duration_seconds_count{{endpoint="{ep}"}} {row["requests"]}')
+        lines.append("# HELP gms_request_phase_seconds_total Time per request phase; sql overlaps the others")
+        lines.append("# TYPE gms_request_phase_seconds_total counter")
+        for endpoint, row in snapshot["requests"].items():
+            for phase, seconds in row["phase_seconds"].items():
+                lines.append(f'gms_request_phase_seconds_total{{endpoint="{escape(endpoint)}",phase="{phase}"}} {seconds}')
+    return "\n".join(lines) + "\n"
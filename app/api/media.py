@@ -0,0 +1,132 @@
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+from typing import BinaryIO, Dict, Optional, Tuple
+from urllib.parse import quote
+import anyio
+from fastapi import HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+from app.core.config import MEDIA_ACCEL_REDIRECT, MEDIA_CHUNK_SIZE, UPLOAD_DIR
+from app.core.response_cache import etag_matches
+
+# Uploaded files are served from UPLOAD_DIR by their image_url. Blobs and
+# their renditions are content-addressed (<sha256>[_<size>].<ext>), so the
+# file name is a strong ETag and the bytes behind a URL never change: clients
+# may keep them for good. Anything else stored there (older per-entity paths)
+# gets a size/mtime validator and must be revalidated.
+
+_CONTENT_ADDRESSED = re.compile(r"[0-9a-f]{64}(_\d+)?")
+_IMMUTABLE = "private, max-age=31536000, immutable"  # behind auth, so not for shared caches
+_REVALIDATE = "private, no-cache"
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+_ZERO_COPY = "http.response.zerocopysend"  # ASGI extension: the server sendfile()s the fd itself
+
+def _open(image_url: str) -> Tuple[BinaryIO, os.stat_result]:
+    root = os.path.realpath(UPLOAD_DIR)
+    try:
+        path = os.path.realpath(os.path.join(root, image_url))
+    except ValueError:  # NUL in the path
+        path = root
+    # anything resolving outside UPLOAD_DIR (.., absolute paths, symlinks out)
+    # is simply not there; .part files are uploads still being written
+    if not path.startswith(root + os.sep) or path.endswith(".part"):
+        raise FileNotFoundError(image_url)
+    f = open(path, "rb")
+    st = os.fstat(f.fileno())  # of what we opened, even if the path is replaced meanwhile
+    if not stat.S_ISREG(st.st_mode):
+        f.close()
+        raise FileNotFoundError(image_url)
+    return f, st
+
+def _validators(path: str, st: os.stat_result) -> Tuple[str, str]:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _CONTENT_ADDRESSED.fullmatch(stem):
+        return f'"{stem}"', _IMMUTABLE
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"', _REVALIDATE
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """[start, end) of a single `bytes=` range, or None to send the whole file.
+
+    Malformed headers and multiple ranges are ignored, since a full 200 is
+    always a valid answer; a range that starts past the end is a 416.
+    """
+    m = _RANGE.fullmatch(header.strip()) if header else None
+    if not m or m.groups() == ("", ""):
+        return None
+    first, last = m.groups()
+    if first:
+        start = int(first)
+        end = size if not last else int(last) + 1
+        if last and end <= start:
+            return None
+    else:  # suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size
+    if start >= size or start == end:
+        raise HTTPException(416, "Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size)
+
+class FileRangeResponse(Response):
+    """Sends bytes [start, end) of an already open file, then closes it."""
+
+    def __init__(self, file: BinaryIO, start: int, end: int, status_code: int, headers: Dict[str, str], media_type: str, send_body: bool = True):
+        self.file, self.start, self.end, self.send_body = file, start, end, send_body
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "Content-Length": str(end - start)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body:
+                await send({"type": "http.response.body", "body": b""})
+            elif _ZERO_COPY in scope.get("extensions", {}):
+                await send({"type": _ZERO_COPY, "file": self.file, "offset": self.start, "count": self.end - self.start, "more_body": False})
+            else:
+                fd, offset, more = self.file.fileno(), self.start, True
+                while more:
+                    size = min(MEDIA_CHUNK_SIZE, self.end - offset)
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, size, offset) if size else b""
+                    offset += len(chunk)
+                    more = bool(chunk) and offset < self.end  # stop early if the file shrank
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more})
+        finally:
+            self.file.close()
+
+async def file_response(request: Request, image_url: str) -> Response:
+    """The upload at image_url: 200, 206 for a Range, 304 when the client's copy is current."""
+    try:
+        f, st = await run_in_threadpool(_open, image_url)
+    except OSError:
+        raise HTTPException(404, "File not found")
+    try:
+        etag, cache_control = _validators(f.name, st)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            f.close()
+            return Response(status_code=304, headers=headers)
+        media_type = mimetypes.guess_type(f.name)[0] or "application/octet-stream"
+        if MEDIA_ACCEL_REDIRECT:
+            # nginx sends the file (sendfile, ranges) from its internal location
+            f.close()
+            relative = os.path.relpath(f.name, os.path.realpath(UPLOAD_DIR)).replace(os.sep, "/")
+            headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + quote(relative)
+            return Response(headers=headers, media_type=media_type)
+        if_range = request.headers.get("if-range")
+        span = byte_range(request.headers.get("range"), st.st_size) if if_range in (None, etag) else None
+        if span is None:
+            return FileRangeResponse(f, 0, st.st_size, 200, headers, media_type, request.method != "HEAD")
+        start, end = span
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{st.st_size}"
+        return FileRangeResponse(f, start, end, 206, headers, media_type, request.method != "HEAD")
+    except BaseException:
+        f.close()
+        raise
@@ -0,0 +1,114 @@
+import base64
+import binascii
+from typing import Dict, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+from app.core.config import DB_ASYNC, PAGE_SIZE_DEFAULT, STREAM_BATCH_SIZE
+from app.core.serialization import dump_rows
+from app.db.session import AsyncSessionLocal, SessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# ---- cursors (opaque to clients: urlsafe base64 of the last id seen) ----
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(400, "Invalid cursor")
+
+# ---- keyset queries ----
+def keyset(stmt: Select, id_column, after: Optional[str], limit: Optional[int] = None) -> Select:
+    if after:
+        stmt = stmt.where(id_column > decode_cursor(after))
+    stmt = stmt.order_by(id_column.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def keyset_page(db: Session, stmt: Select, id_column, after: Optional[str], limit: Optional[int]) -> Tuple[List, Optional[str]]:
+    """Fetch one page plus a look-ahead row; the cursor is only set when more rows exist."""
+    limit = limit or PAGE_SIZE_DEFAULT
+    rows = db.scalars(keyset(stmt, id_column, after, limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(getattr(rows[-1], id_column.key))
+    return rows, None
+
+def next_page_headers(request: Request, cursor: Optional[str]) -> Dict[str, str]:
+    """Headers pointing at the next page, none on the last one.
+
+    Besides X-Next-Cursor there is a standard `Link: <...>; rel="next"` (relative
+    to the request, so a cached page serves any host), which HTTP clients that
+    predate paging can follow to fetch past the first PAGE_SIZE_DEFAULT rows.
+    """
+    if not cursor:
+        return {}
+    url = request.url.include_query_params(after=cursor)
+    return {NEXT_CURSOR_HEADER: cursor, "Link": f'<{url.path}?{url.query}>; rel="next"'}
+
+# ---- streaming ----
+def _encode(batch, schema: Type[BaseModel], first: bool) -> bytes:
+    body = dump_rows(batch, schema)[1:-1]  # the batch's elements, without the brackets
+    return body if first else b"," + body
+
+def _next_batch(stmt: Select, id_column, last_id: Optional[int], remaining: Optional[int]) -> Tuple[Select, int]:
+    size = STREAM_BATCH_SIZE if remaining is None else min(STREAM_BATCH_SIZE, remaining)
+    if last_id is not None:
+        stmt = stmt.where(id_column > last_id)
+    return stmt.order_by(id_column.asc()).limit(size), size
+
+def stream_json_array(stmt: Select, id_column, after: Optional[str], limit: Optional[int], schema: Type[BaseModel]) -> StreamingResponse:
+    """Stream a JSON array in keyset batches of STREAM_BATCH_SIZE rows.
+
+    Each batch is a short query of its own with its eager loads, so nothing
+    stays open between batches (yield_per cannot be combined with
+    selectinload). The request's session is closed before the body is sent,
+    so the stream opens its own.
+    """
+    start = decode_cursor(after) if after else None  # a bad cursor is a 400, not a broken stream
+
+    async def body_async():
+        async with AsyncSessionLocal() as db:
+            yield b"["
+            last_id, remaining, first = start, limit, True
+            while remaining is None or remaining > 0:
+                batch, size = _next_batch(stmt, id_column, last_id, remaining)
+                rows = (await db.scalars(batch)).all()
+                if rows:
+                    yield _encode(rows, schema, first)
+                    first = False
+                if len(rows) < size:
+                    break
+                last_id = getattr(rows[-1], id_column.key)
+                remaining = None if remaining is None else remaining - size
+                db.expunge_all()  # hold one batch in memory, not the whole table
+            yield b"]"
+
+    def body_sync():
+        db = SessionLocal()
+        try:
+            yield b"["
+            last_id, remaining, first = start, limit, True
+            while remaining is None or remaining > 0:
+                batch, size = _next_batch(stmt, id_column, last_id, remaining)
+                rows = db.scalars(batch).all()
+                if rows:
+                    yield _encode(rows, schema, first)
+                    first = False
+                if len(rows) < size:
+                    break
+                last_id = getattr(rows[-1], id_column.key)
+                remaining = None if remaining is None else remaining - size
+                db.expunge_all()
+            yield b"]"
+        finally:
+            db.close()
+
+    return StreamingResponse(body_async() if DB_ASYNC else body_sync(), media_type="application/json")
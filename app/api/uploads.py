@@ -0,0 +1,392 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.core.config import (
+    UPLOAD_DIR,
+    BLOB_SUBDIR,
+    INCOMING_SUBDIR,
+    PARTIAL_SUBDIR,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_FILES,
+    UPLOAD_MAX_FILE_BYTES,
+    UPLOAD_MAX_REQUEST_BYTES,
+    UPLOAD_SESSION_GC_INTERVAL_SECONDS,
+    UPLOAD_SESSION_TTL_SECONDS,
+)
+from app.db.dialect import insert_for
+from app.db.session import SessionLocal
+from app.models import ImageBlob, UploadSession
+
+log = logging.getLogger(__name__)
+
+# Uploads are stored once per distinct content under a sharded sha256 layout:
+#   UPLOAD_DIR/blobs/<2 hex>/<2 hex>/<sha256><ext>
+# Image rows keep the relative path as image_url; image_blobs lists what is stored.
+
+class StoredBlob(NamedTuple):
+    path: str  # relative to UPLOAD_DIR
+    digest: str
+    size: int
+
+def blob_path(digest: str, ext: str) -> str:
+    return os.path.join(BLOB_SUBDIR, digest[:2], digest[2:4], f"{digest}{ext}")
+
+def _extension(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ".jpg" if ext == ".jpeg" else ext
+
+# ---- multipart uploads ----
+# The body is parsed as it streams in instead of being spooled whole by the
+# form parser, so the count and size limits stop a request at the part or
+# chunk that breaks them. Each file is hashed while it is written to
+# UPLOAD_DIR/incoming, and moved into the blob store only once the whole
+# request has passed: a rejected or dropped upload leaves nothing behind.
+# Every file has its own writer on the threadpool, so files are written
+# concurrently, and while the next chunk of the body is read.
+
+UPLOAD_FIELD = "files"
+UPLOAD_REQUEST_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": [UPLOAD_FIELD],
+    "properties": {UPLOAD_FIELD: {"type": "array", "items": {"type": "string", "format": "binary"}}},
+}}}}}  # openapi_extra for handlers that call receive_uploads
+
+def _too_large() -> HTTPException:
+    return HTTPException(413, f"Upload exceeds {UPLOAD_MAX_REQUEST_BYTES} bytes per request")
+
+class _Incoming:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.tmp = os.path.join(UPLOAD_DIR, INCOMING_SUBDIR, f"{uuid.uuid4().hex}.part")
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.pending = bytearray()
+        self.file = None
+        self.ended = False
+        self.closed = False  # the close is queued for its writer
+        self.writer: Optional[asyncio.Future] = None  # the write in flight, at most one per file
+
+class _UploadParser:
+    """python-multipart callbacks: they only hash and buffer, flush() hands the bytes to the writers."""
+
+    def __init__(self, boundary: bytes):
+        self.files: List[_Incoming] = []
+        self.part: _Incoming | None = None
+        self.header, self.value, self.disposition = b"", b"", b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+
+    def on_part_begin(self):
+        self.part, self.disposition = None, b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.value += data[start:end]
+
+    def on_header_end(self):
+        if self.header.lower() == b"content-disposition":
+            self.disposition = self.value
+        self.header, self.value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        if options.get(b"name") != UPLOAD_FIELD.encode() or b"filename" not in options:
+            return  # other fields are read past, still counting against the request budget
+        if len(self.files) == UPLOAD_MAX_FILES:
+            raise HTTPException(413, f"At most {UPLOAD_MAX_FILES} files per request")
+        self.part = _Incoming(options[b"filename"].decode("utf-8", "replace"))
+        self.files.append(self.part)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        part = self.part
+        if part is None:
+            return
+        part.size += end - start
+        if part.size > UPLOAD_MAX_FILE_BYTES:
+            raise HTTPException(413, f"{part.filename} exceeds {UPLOAD_MAX_FILE_BYTES} bytes")
+        chunk = data[start:end]
+        part.sha.update(chunk)
+        part.pending += chunk
+
+    def on_part_end(self):
+        if self.part is not None:
+            self.part.ended = True
+
+    def write(self, chunk: Optional[bytes]) -> None:
+        """Parse the next chunk of the body; None ends it."""
+        try:
+            if chunk is None:
+                self.parser.finalize()
+            else:
+                self.parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(400, "Malformed multipart body")
+
+    async def flush(self):
+        # a file whose previous write is still running holds the body back, which bounds
+        # memory to about a chunk per file; the other files' writes go on meanwhile
+        for part in self.files:
+            if part.writer is None or part.pending or part.ended and not part.closed:
+                if part.writer is not None:
+                    await part.writer
+                data, part.pending, part.closed = part.pending, bytearray(), part.ended
+                part.writer = asyncio.ensure_future(run_in_threadpool(_spool, part, data, part.closed))
+
+    async def settle(self) -> None:
+        """Wait for every file's last write; the first failure is raised once all have ended."""
+        writers = [part.writer for part in self.files if part.writer is not None]
+        for result in await asyncio.gather(*writers, return_exceptions=True):
+            if isinstance(result, BaseException):
+                raise result
+
+def _spool(part: _Incoming, data: bytearray, close: bool) -> None:
+    if part.file is None:
+        os.makedirs(os.path.dirname(part.tmp), exist_ok=True)
+        part.file = open(part.tmp, "wb")
+    if data:
+        part.file.write(data)
+    if close:
+        part.file.close()
+
+def _promote(files: List[_Incoming]) -> List[StoredBlob]:
+    blobs = []
+    for part in files:
+        path = blob_path(part.sha.hexdigest(), _extension(part.filename))
+        dest = os.path.join(UPLOAD_DIR, path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(part.tmp)  # known content costs no write
+        else:
+            os.replace(part.tmp, dest)  # atomic publish; a concurrent writer of the same content has identical bytes
+        blobs.append(StoredBlob(path, part.sha.hexdigest(), part.size))
+    return blobs
+
+def _discard(files: List[_Incoming]) -> None:
+    for part in files:
+        if part.file is not None:
+            part.file.close()
+        try:
+            os.remove(part.tmp)
+        except FileNotFoundError:
+            pass
+
+async def receive_uploads(request: Request) -> List[StoredBlob]:
+    """Store the `files` parts of a multipart request body in the blob store.
+
+    A Content-Length over UPLOAD_MAX_REQUEST_BYTES is refused before reading;
+    otherwise UPLOAD_MAX_FILES, UPLOAD_MAX_FILE_BYTES and the request budget
+    are enforced as parts and bytes arrive. Known content costs no write.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > UPLOAD_MAX_REQUEST_BYTES:
+        raise _too_large()
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(415, "Expected a multipart/form-data body")
+    parser = _UploadParser(params[b"boundary"])
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > UPLOAD_MAX_REQUEST_BYTES:
+                raise _too_large()
+            parser.write(chunk)
+            await parser.flush()
+        parser.write(None)
+        if not all(part.ended for part in parser.files):
+            raise HTTPException(400, "Multipart body ends inside a file")
+        if not parser.files:
+            raise HTTPException(422, f"No '{UPLOAD_FIELD}' file parts in the request")
+        await parser.flush()
+        await parser.settle()
+        return await run_in_threadpool(_promote, parser.files)
+    except BaseException:
+        # no writer may still hold a file when it is removed
+        await asyncio.gather(*(p.writer for p in parser.files if p.writer is not None), return_exceptions=True)
+        await run_in_threadpool(_discard, parser.files)
+        raise
+
+def register_blobs(db: Session, blobs: Iterable[StoredBlob]) -> None:
+    """Insert rows for blobs not listed yet; caller commits."""
+    rows = {b.path: b for b in blobs}
+    if not rows:
+        return
+    db.execute(
+        insert_for(db, ImageBlob).on_conflict_do_nothing(index_elements=[ImageBlob.path]),
+        [{"path": b.path, "digest": b.digest, "size": b.size} for b in rows.values()],
+    )
+
+def stored_blob_paths(db: Session, image_urls: Iterable[str]) -> List[str]:
+    """The client-supplied image_urls that name a stored blob.
+
+    Anything else a client sent is just a URL and has nothing on disk to render.
+    """
+    paths = {url for url in image_urls if url.startswith(BLOB_SUBDIR + "/")}
+    if not paths:
+        return []
+    return list(db.scalars(select(ImageBlob.path).where(ImageBlob.path.in_(paths))))
+
+# ---- resumable sessions ----
+# A session's bytes go straight into UPLOAD_DIR/partial/<id>.part at the
+# offsets the client names, in any order; the row keeps the merged ranges
+# stored so far. Completing hashes the file and moves it into the blob store
+# like any other upload.
+
+Ranges = List[Tuple[int, int]]  # [start, end) byte spans
+
+def partial_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, PARTIAL_SUBDIR, f"{session_id}.part")
+
+def parse_ranges(text: str) -> Ranges:
+    return [tuple(int(n) for n in span.split("-")) for span in text.split(",") if span]
+
+def format_ranges(ranges: Ranges) -> str:
+    return ",".join(f"{start}-{end}" for start, end in ranges)
+
+def merge_range(ranges: Ranges, start: int, end: int) -> Ranges:
+    merged: Ranges = []
+    for a, b in sorted([*ranges, (start, end)]):
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+def create_partial(session_id: str, size: int) -> None:
+    path = partial_path(session_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "xb") as f:
+        f.truncate(size)  # sparse: chunks can land anywhere
+
+def _pwrite_all(fd: int, data: bytearray, offset: int) -> int:
+    view = memoryview(data)
+    while view:
+        n = os.pwrite(fd, view, offset)
+        view, offset = view[n:], offset + n
+    return len(data)
+
+async def write_range(session_id: str, start: int, length: int, body: AsyncIterator[bytes]) -> Tuple[int, bool]:
+    """Write a request body into a session's file at start, as it arrives.
+
+    At most UPLOAD_CHUNK_SIZE bytes are held in memory. Returns (bytes
+    written, overflow): a dropped connection keeps whatever arrived, and
+    overflow means the body ran past length (the excess is not written).
+    """
+    fd = await run_in_threadpool(os.open, partial_path(session_id), os.O_WRONLY)
+    written, pending, overflow = 0, bytearray(), False
+    try:
+        async for chunk in body:
+            room = length - written - len(pending)
+            if len(chunk) > room:
+                chunk, overflow = chunk[:room], True
+            pending += chunk
+            if len(pending) >= UPLOAD_CHUNK_SIZE or overflow:
+                written += await run_in_threadpool(_pwrite_all, fd, pending, start + written)
+                pending = bytearray()
+            if overflow:
+                break
+    except ClientDisconnect:
+        pass
+    finally:
+        try:
+            if pending:
+                written += await run_in_threadpool(_pwrite_all, fd, pending, start + written)
+        finally:
+            await run_in_threadpool(os.close, fd)
+    return written, overflow
+
+def publish_partial(session_id: str, filename: str) -> StoredBlob:
+    """Hash a finished session's file and move it into the blob store (blocking)."""
+    part = partial_path(session_id)
+    with open(part, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+        size = os.fstat(f.fileno()).st_size
+    path = blob_path(digest, _extension(filename))
+    dest = os.path.join(UPLOAD_DIR, path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if os.path.exists(dest):
+        os.remove(part)  # already stored: known content costs no copy
+    else:
+        os.replace(part, dest)
+    return StoredBlob(path, digest, size)
+
+def remove_partial(session_id: str) -> None:
+    try:
+        os.remove(partial_path(session_id))
+    except FileNotFoundError:
+        pass
+
+def _remove_incoming(before: float) -> None:
+    # multipart upload files left over from a crash (live ones are written to as they stream)
+    directory = os.path.join(UPLOAD_DIR, INCOMING_SUBDIR)
+    if not os.path.isdir(directory):
+        return
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.stat().st_mtime < before:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+def collect_stale_uploads(db: Session) -> int:
+    """Delete sessions idle for UPLOAD_SESSION_TTL_SECONDS and their partial files; returns sessions removed."""
+    cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+    stale = set(db.scalars(select(UploadSession.id).where(UploadSession.updated_at < cutoff)))
+    if stale:
+        # re-checked: a chunk may have arrived since
+        db.execute(delete(UploadSession).where(UploadSession.id.in_(stale), UploadSession.updated_at < cutoff))
+    live = set(db.scalars(select(UploadSession.id)))
+    db.commit()
+    _remove_incoming(time.time() - UPLOAD_SESSION_TTL_SECONDS)
+    directory = os.path.join(UPLOAD_DIR, PARTIAL_SUBDIR)
+    if not os.path.isdir(directory):
+        return len(stale - live)
+    # any other file without a row is left over from a crash, unless its
+    # session was created a moment ago and is not committed yet
+    orphaned = time.time() - 60
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            session_id = entry.name.removesuffix(".part")
+            if session_id not in live and (session_id in stale or entry.stat().st_mtime < orphaned):
+                remove_partial(session_id)
+    return len(stale - live)
+
+def _collect_stale_uploads() -> int:
+    db = SessionLocal()
+    try:
+        return collect_stale_uploads(db)
+    finally:
+        db.close()
+
+async def sweep_upload_sessions() -> None:
+    """Collect stale sessions every UPLOAD_SESSION_GC_INTERVAL_SECONDS until cancelled."""
+    while True:
+        await asyncio.sleep(UPLOAD_SESSION_GC_INTERVAL_SECONDS)
+        try:
+            removed = await run_in_threadpool(_collect_stale_uploads)
+            if removed:
+                log.info("removed %d stale upload sessions", removed)
+        except Exception:
+            log.exception("upload session sweep failed")
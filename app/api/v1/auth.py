@@ -1,83 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token
+from app.db.session import DbSession, get_db
+from app.core.security import hash_password_async, verify_and_update_password_async
+from app.core.refresh_tokens import TokenRevoked, device_sessions, issue_tokens, revoke_family, rotate
 from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM
-from app.schemas.user import UserCreate, UserOut
-from app.models import User, Group
+from app.schemas.user import DeviceSessionOut, UserCreate, UserOut
+from app.models import User
+from app.core.groups import link_groups, resolve_groups, unique_names
+from app.core.permission_table import reload_permission_table
+from app.api.deps import get_current_user
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserOut)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == user_in.username).first():
-        raise HTTPException(400, "Username already exists")
+def _get_user(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
 
+def _create_user(db: Session, user_in: UserCreate, password_hash: str) -> UserOut:
+    # one transaction: user, groups resolved/created by name, links in bulk
     user = User(
         username=user_in.username,
         email=user_in.email,
-        password=hash_password(user_in.password),
+        password=password_hash,
         role="user",
     )
     db.add(user)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "Username or email already exists")
+    names = unique_names(user_in.groups)
+    group_ids, created_groups = resolve_groups(db, names)
+    link_groups(db, [user.id], group_ids.values(), new_users=True)
+    out = UserOut(id=user.id, username=user.username, email=user.email, role=user.role, groups=names)
     db.commit()
-    db.refresh(user)
+    if created_groups:
+        # permissions may already name the new group; recompile so its id is picked up
+        reload_permission_table(db)
+    return out
 
-    # attach groups by name (create if missing)
-    for gname in user_in.groups:
-        group = db.query(Group).filter(Group.name == gname).first()
-        if not group:
-            group = Group(name=gname)
-            db.add(group)
-            db.commit()
-            db.refresh(group)
-        if group not in user.groups:
-            user.groups.append(group)
-    db.commit()
-    db.refresh(user)
+# register/login await bcrypt in its own process pool between their DB sections
+@router.post("/register", response_model=UserOut)
+async def register(user_in: UserCreate, db: DbSession = Depends(get_db)):
+    if await db.run_sync(_get_user, user_in.username):
+        raise HTTPException(400, "Username already exists")
+    password_hash = await hash_password_async(user_in.password)
+    return await db.run_sync(_create_user, user_in, password_hash)
 
-    return UserOut(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role,
-        groups=[g.name for g in user.groups],
-    )
+def _issue_tokens(db: Session, user: User, new_hash: str | None, device: str | None) -> dict:
+    if new_hash:
+        user.password = new_hash  # BCRYPT_ROUNDS changed since this hash was made
+    tokens = issue_tokens(db, user, device)
+    db.commit()
+    return tokens
 
 @router.post("/login")
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form.username).first()
-    if not user or not verify_password(form.password, user.password):
+async def login(
+    request: Request,
+    form: OAuth2PasswordRequestForm = Depends(),
+    db: DbSession = Depends(get_db),
+    device: str | None = Header(None, alias="X-Device-Name", description="Shown in /auth/sessions; defaults to the User-Agent"),
+):
+    """Start a device session: an access token and a single-use refresh token."""
+    user = await db.run_sync(_get_user, form.username)
+    if not user:
         raise HTTPException(400, "Invalid credentials")
+    valid, new_hash = await verify_and_update_password_async(form.password, user.password)
+    if not valid:
+        raise HTTPException(400, "Invalid credentials")
+    device = (device or request.headers.get("user-agent") or "")[:200] or None
+    return await db.run_sync(_issue_tokens, user, new_hash, device)
 
-    access = create_access_token({"sub": user.username, "role": user.role})
-    refresh = create_refresh_token({"sub": user.username, "role": user.role})
-    user.refresh_token = refresh
-    db.commit()
-    return {"access_token": access, "refresh_token": refresh, "token_type": "bearer"}
-
-@router.post("/refresh-token")
-def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
+def _decode_refresh(refresh_token: str) -> dict:
     try:
         payload = jwt.decode(refresh_token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        if payload.get("typ") != "refresh":
-            raise HTTPException(401, "Invalid token type")
-        username = payload.get("sub")
-        user = db.query(User).filter(User.username == username).first()
-        if not user or user.refresh_token != refresh_token:
-            raise HTTPException(401, "Invalid refresh token")
-        access = create_access_token({"sub": user.username, "role": user.role})
-        return {"access_token": access, "token_type": "bearer"}
     except JWTError:
         raise HTTPException(401, "Invalid refresh token")
+    if payload.get("typ") != "refresh":
+        raise HTTPException(401, "Invalid token type")
+    return payload
+
+@router.post("/refresh-token")
+async def refresh_token(refresh_token: str, db: DbSession = Depends(get_db)):
+    """Exchange a refresh token for a new access token and the session's next refresh token.
+
+    Each refresh token works once: presenting a used one again ends its
+    device session.
+    """
+    payload = _decode_refresh(refresh_token)
+    try:
+        return await db.run_sync(rotate, payload)
+    except TokenRevoked:
+        raise HTTPException(401, "Refresh token revoked")
 
 @router.post("/logout")
-def logout(db: Session = Depends(get_db), form: OAuth2PasswordRequestForm = Depends()):
-    user = db.query(User).filter(User.username == form.username).first()
-    if not user:
-        raise HTTPException(404, "User not found")
-    user.refresh_token = None
-    db.commit()
+async def logout(refresh_token: str, db: DbSession = Depends(get_db)):
+    """End the device session the refresh token belongs to."""
+    payload = _decode_refresh(refresh_token)
+    if payload.get("fam"):
+        await db.run_sync(revoke_family, payload["fam"])
     return {"message": "Logged out"}
+
+def _sessions(db: Session, user_id: int) -> List[DeviceSessionOut]:
+    return [
+        DeviceSessionOut(id=t.family, device=t.device, last_used_at=t.issued_at, expires_at=t.expires_at)
+        for t in device_sessions(db, user_id)
+    ]
+
+@router.get("/sessions", response_model=List[DeviceSessionOut])
+async def list_sessions(db: DbSession = Depends(get_db), current_user=Depends(get_current_user)):
+    """The caller's signed-in devices."""
+    return await db.run_sync(_sessions, current_user.id)
+
+@router.delete("/sessions/{session_id}")
+async def revoke_session(session_id: str, db: DbSession = Depends(get_db), current_user=Depends(get_current_user)):
+    """Sign a device out: its refresh token stops working (access tokens run out on their own)."""
+    if not await db.run_sync(revoke_family, session_id, current_user.id):
+        raise HTTPException(404, "Session not found")
+    return {"message": "Session revoked"}
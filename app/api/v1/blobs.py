@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import DbSession, get_db
+from app.models import ImageBlob
+from app.schemas.blob import ImageBlobOut
+from app.api.deps import get_current_user
+
+router = APIRouter()
+
+def _find_blob(db: Session, digest: str) -> ImageBlob | None:
+    return db.query(ImageBlob).filter(ImageBlob.digest == digest.lower()).first()
+
+@router.api_route("/{digest}", methods=["GET", "HEAD"], response_model=ImageBlobOut)
+async def get_blob(digest: str, db: DbSession = Depends(get_db), _=Depends(get_current_user)):
+    """Look up stored content by sha256 so clients can skip re-uploading it.
+
+    The returned image_url can be passed straight to the create endpoints.
+    """
+    blob = await db.run_sync(_find_blob, digest)
+    if not blob:
+        raise HTTPException(404, "Blob not found")
+    return ImageBlobOut(digest=blob.digest, image_url=blob.path, size=blob.size)
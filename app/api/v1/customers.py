@@ -1,62 +1,133 @@
-from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import DbSession, get_db
 from app.schemas.customer import CustomerCreate, CustomerOut
+from app.schemas.imports import ImportResult
 from app.models import Customer, CustomerImage
-from app.api.deps import permission_required, get_current_user
-from app.core.config import UPLOAD_DIR, CUSTOMER_UPLOAD_SUBDIR
-import os
-import uuid
-import shutil
+from app.api.deps import permission_required, get_current_user, get_token_principal
+from app.db.loading import select_for
+from app.db.search import search
+from app.api.imports import import_request_body, run_import
+from app.api.uploads import UPLOAD_REQUEST_BODY, StoredBlob, receive_uploads, register_blobs, stored_blob_paths
+from app.api.pagination import keyset_page, next_page_headers, stream_json_array
+from app.core.config import PAGE_SIZE_MAX, SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX
+from app.core.derivatives import enqueue_derivatives
+from app.core.response_cache import cached_json
+from app.core.serialization import rows_response
 
 router = APIRouter()
 
-@router.post("/", response_model=CustomerOut)
-def create_customer(
-    payload: CustomerCreate,
-    db: Session = Depends(get_db),
-    _=Depends(permission_required("create-customer"))
-):
+_PAGE_TABLES = ("customers", "customer_images")  # everything a page of CustomerOut reads
+
+def _load(db: Session, customer_id: int) -> Customer:
+    return db.scalars(select_for(Customer, CustomerOut).where(Customer.id == customer_id)).one()
+
+def _create_customer(db: Session, payload: CustomerCreate) -> Tuple[Customer, List[str]]:
     if payload.email and db.query(Customer).filter(Customer.email == payload.email).first():
         raise HTTPException(400, "Email already exists")
     customer = Customer(name=payload.name, email=payload.email, phone=payload.phone)
+    customer.images = [CustomerImage(image_url=img.image_url) for img in payload.images]
     db.add(customer)
+    blobs = stored_blob_paths(db, [img.image_url for img in payload.images])
     db.commit()
-    db.refresh(customer)
+    return _load(db, customer.id), blobs
 
-    for img in payload.images:
-        db.add(CustomerImage(customer_id=customer.id, image_url=img.image_url))
-    db.commit()
-    db.refresh(customer)
+@router.post("/", response_model=CustomerOut)
+async def create_customer(
+    payload: CustomerCreate,
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("create-customer"))
+):
+    customer, blobs = await db.run_sync(_create_customer, payload)
+    enqueue_derivatives(blobs)
     return customer
 
 @router.get("/", response_model=List[CustomerOut])
-def list_customers(db: Session = Depends(get_db), _=Depends(get_current_user)):
-    return db.query(Customer).all()
+async def list_customers(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor response header"),
+    stream: bool = Query(False, description="Stream all rows after the cursor instead of one page"),
+    db: DbSession = Depends(get_db),
+    _=Depends(get_token_principal),  # no users lookup, so a cached page or 304 needs no query
+):
+    stmt = select_for(Customer, CustomerOut)
+    if stream:
+        return stream_json_array(stmt, Customer.id, after, limit, CustomerOut)
+
+    async def build():
+        customers, next_cursor = await db.run_sync(keyset_page, stmt, Customer.id, after, limit)
+        return customers, next_page_headers(request, next_cursor)
+
+    # polled constantly; unchanged pages are served from memory or answered with 304
+    return await cached_json(request, _PAGE_TABLES, CustomerOut, build)
 
-@router.post("/{customer_id}/images/upload", response_model=CustomerOut)
-def upload_customer_images(
+@router.get("/search", response_model=List[CustomerOut])
+async def search_customers(
+    q: str = Query(..., min_length=2, description="Part of the name / email / phone; tolerates typos"),
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+    db: DbSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    rows = await db.run_sync(search, select_for(Customer, CustomerOut), Customer.id, [Customer.name, Customer.email, Customer.phone], q.strip(), limit)
+    return rows_response(rows, CustomerOut)
+
+def _attach_images(db: Session, customer_id: int, blobs: List[StoredBlob]) -> Customer:
+    register_blobs(db, blobs)
+    db.execute(insert(CustomerImage), [{"customer_id": customer_id, "image_url": b.path} for b in blobs])
+    db.commit()
+    return _load(db, customer_id)
+
+@router.post("/{customer_id}/images/upload", response_model=CustomerOut, openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_customer_images(
     customer_id: int,
-    files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    request: Request,
+    db: DbSession = Depends(get_db),
     _=Depends(permission_required("customer-upload-images"))  # configure in permissions table
 ):
-    customer = db.query(Customer).get(customer_id)
-    if not customer:
+    if not await db.run_sync(lambda s: s.get(Customer, customer_id)):
         raise HTTPException(404, "Customer not found")
 
-    base_path = os.path.join(UPLOAD_DIR, CUSTOMER_UPLOAD_SUBDIR, str(customer_id))
-    os.makedirs(base_path, exist_ok=True)
-
-    for f in files:
-        ext = os.path.splitext(f.filename)[1].lower()
-        fname = f"{uuid.uuid4().hex}{ext}"
-        path = os.path.join(base_path, fname)
-        with open(path, "wb") as out:
-            shutil.copyfileobj(f.file, out)
-        rel_path = os.path.relpath(path, start=UPLOAD_DIR)
-        db.add(CustomerImage(customer_id=customer.id, image_url=rel_path))
-    db.commit()
-    db.refresh(customer)
+    blobs = await receive_uploads(request)  # read only after the permission and 404 checks
+    customer = await db.run_sync(_attach_images, customer_id, blobs)
+    enqueue_derivatives(b.path for b in blobs)
     return customer
+
+def _insert_customers(db: Session, rows: List[Tuple[int, CustomerCreate]]):
+    emails = {row.email for _, row in rows if row.email}
+    taken = set(db.scalars(select(Customer.email).where(Customer.email.in_(emails)))) if emails else set()
+    rejected, accepted, blobs = [], [], []
+    for line, row in rows:
+        if row.email and row.email in taken:
+            rejected.append((line, "Email already exists"))
+            continue
+        if row.email:
+            taken.add(row.email)  # later rows of the same file
+        accepted.append(row)
+    if accepted:
+        ids = db.scalars(
+            insert(Customer).returning(Customer.id, sort_by_parameter_order=True),
+            [{"name": row.name, "email": row.email, "phone": row.phone} for row in accepted],
+        ).all()
+        images = [
+            {"customer_id": customer_id, "image_url": img.image_url}
+            for customer_id, row in zip(ids, accepted)
+            for img in row.images
+        ]
+        if images:
+            db.execute(insert(CustomerImage), images)
+            blobs = stored_blob_paths(db, [img["image_url"] for img in images])
+    return rejected, accepted, blobs
+
+@router.post("/import", response_model=ImportResult, openapi_extra=import_request_body(
+    "CSV with a header row (name,email,phone,images) or NDJSON of CustomerCreate"
+))
+async def import_customers(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults to the file extension or content type"),
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("import-customers")),
+):
+    return await run_import(db, request, format, CustomerCreate, _insert_customers)
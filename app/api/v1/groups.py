@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db.session import DbSession, get_db
+from app.api.deps import require_admin
+from app.core.groups import link_groups, resolve_groups, unique_names
+from app.core.permission_table import reload_permission_table
+from app.core.principal import bump_security_version
+from app.models import User
+from app.schemas.user import GroupAssignIn, GroupAssignOut
+
+router = APIRouter()
+
+def _assign_groups(db: Session, payload: GroupAssignIn) -> GroupAssignOut:
+    usernames = unique_names(payload.usernames)
+    users = dict(db.execute(select(User.id, User.username).where(User.username.in_(usernames))).all())
+    unknown = sorted(set(usernames) - set(users.values()))
+    if unknown:
+        raise HTTPException(404, f"Unknown users: {', '.join(unknown)}")
+    group_ids, created = resolve_groups(db, unique_names(payload.groups))
+    try:
+        added = link_groups(db, users, group_ids.values())
+        updated = {user_id for user_id, _ in added}
+        # access tokens carry group ids; make holders re-authenticate
+        bump_security_version(db, updated)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Group membership changed concurrently, retry")
+    if created:
+        reload_permission_table(db)
+    return GroupAssignOut(
+        created_groups=created,
+        links_added=len(added),
+        users_updated=sorted(users[user_id] for user_id in updated),
+    )
+
+@router.post("/assign", response_model=GroupAssignOut)
+async def assign_groups(
+    payload: GroupAssignIn,
+    db: DbSession = Depends(get_db),
+    _=Depends(require_admin),
+):
+    return await db.run_sync(_assign_groups, payload)
@@ -1,62 +1,133 @@
-from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import DbSession, get_db
 from app.schemas.item import ItemCreate, ItemOut
+from app.schemas.imports import ImportResult
 from app.models import Item, ItemImage
-from app.api.deps import permission_required, get_current_user
-from app.core.config import UPLOAD_DIR, ITEM_UPLOAD_SUBDIR
-import os
-import uuid
-import shutil
+from app.api.deps import permission_required, get_current_user, get_token_principal
+from app.db.loading import select_for
+from app.db.search import search
+from app.api.imports import import_request_body, run_import
+from app.api.uploads import UPLOAD_REQUEST_BODY, StoredBlob, receive_uploads, register_blobs, stored_blob_paths
+from app.api.pagination import keyset_page, next_page_headers, stream_json_array
+from app.core.config import PAGE_SIZE_MAX, SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX
+from app.core.derivatives import enqueue_derivatives
+from app.core.response_cache import cached_json
+from app.core.serialization import rows_response
 
 router = APIRouter()
 
-@router.post("/", response_model=ItemOut)
-def create_item(
-    payload: ItemCreate,
-    db: Session = Depends(get_db),
-    _=Depends(permission_required("create-item"))
-):
+_PAGE_TABLES = ("items", "item_images")  # everything a page of ItemOut reads
+
+def _load(db: Session, item_id: int) -> Item:
+    return db.scalars(select_for(Item, ItemOut).where(Item.id == item_id)).one()
+
+def _create_item(db: Session, payload: ItemCreate) -> Tuple[Item, List[str]]:
     if payload.sku and db.query(Item).filter(Item.sku == payload.sku).first():
         raise HTTPException(400, "SKU already exists")
     item = Item(name=payload.name, sku=payload.sku, price=payload.price)
+    item.images = [ItemImage(image_url=img.image_url) for img in payload.images]
     db.add(item)
+    blobs = stored_blob_paths(db, [img.image_url for img in payload.images])
     db.commit()
-    db.refresh(item)
+    return _load(db, item.id), blobs
 
-    for img in payload.images:
-        db.add(ItemImage(item_id=item.id, image_url=img.image_url))
-    db.commit()
-    db.refresh(item)
+@router.post("/", response_model=ItemOut)
+async def create_item(
+    payload: ItemCreate,
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("create-item"))
+):
+    item, blobs = await db.run_sync(_create_item, payload)
+    enqueue_derivatives(blobs)
     return item
 
 @router.get("/", response_model=List[ItemOut])
-def list_items(db: Session = Depends(get_db), _=Depends(get_current_user)):
-    return db.query(Item).all()
+async def list_items(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor response header"),
+    stream: bool = Query(False, description="Stream all rows after the cursor instead of one page"),
+    db: DbSession = Depends(get_db),
+    _=Depends(get_token_principal),  # no users lookup, so a cached page or 304 needs no query
+):
+    stmt = select_for(Item, ItemOut)
+    if stream:
+        return stream_json_array(stmt, Item.id, after, limit, ItemOut)
+
+    async def build():
+        items, next_cursor = await db.run_sync(keyset_page, stmt, Item.id, after, limit)
+        return items, next_page_headers(request, next_cursor)
+
+    # polled constantly; unchanged pages are served from memory or answered with 304
+    return await cached_json(request, _PAGE_TABLES, ItemOut, build)
 
-@router.post("/{item_id}/images/upload", response_model=ItemOut)
-def upload_item_images(
+@router.get("/search", response_model=List[ItemOut])
+async def search_items(
+    q: str = Query(..., min_length=2, description="Part of the name / sku; tolerates typos"),
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+    db: DbSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    rows = await db.run_sync(search, select_for(Item, ItemOut), Item.id, [Item.name, Item.sku], q.strip(), limit)
+    return rows_response(rows, ItemOut)
+
+def _attach_images(db: Session, item_id: int, blobs: List[StoredBlob]) -> Item:
+    register_blobs(db, blobs)
+    db.execute(insert(ItemImage), [{"item_id": item_id, "image_url": b.path} for b in blobs])
+    db.commit()
+    return _load(db, item_id)
+
+@router.post("/{item_id}/images/upload", response_model=ItemOut, openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_item_images(
     item_id: int,
-    files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    request: Request,
+    db: DbSession = Depends(get_db),
     _=Depends(permission_required("item-upload-images"))
 ):
-    item = db.query(Item).get(item_id)
-    if not item:
+    if not await db.run_sync(lambda s: s.get(Item, item_id)):
         raise HTTPException(404, "Item not found")
 
-    base_path = os.path.join(UPLOAD_DIR, ITEM_UPLOAD_SUBDIR, str(item_id))
-    os.makedirs(base_path, exist_ok=True)
-
-    for f in files:
-        ext = os.path.splitext(f.filename)[1].lower()
-        fname = f"{uuid.uuid4().hex}{ext}"
-        path = os.path.join(base_path, fname)
-        with open(path, "wb") as out:
-            shutil.copyfileobj(f.file, out)
-        rel_path = os.path.relpath(path, start=UPLOAD_DIR)
-        db.add(ItemImage(item_id=item.id, image_url=rel_path))
-    db.commit()
-    db.refresh(item)
+    blobs = await receive_uploads(request)  # read only after the permission and 404 checks
+    item = await db.run_sync(_attach_images, item_id, blobs)
+    enqueue_derivatives(b.path for b in blobs)
     return item
+
+def _insert_items(db: Session, rows: List[Tuple[int, ItemCreate]]):
+    skus = {row.sku for _, row in rows if row.sku}
+    taken = set(db.scalars(select(Item.sku).where(Item.sku.in_(skus)))) if skus else set()
+    rejected, accepted, blobs = [], [], []
+    for line, row in rows:
+        if row.sku and row.sku in taken:
+            rejected.append((line, "SKU already exists"))
+            continue
+        if row.sku:
+            taken.add(row.sku)  # later rows of the same file
+        accepted.append(row)
+    if accepted:
+        ids = db.scalars(
+            insert(Item).returning(Item.id, sort_by_parameter_order=True),
+            [{"name": row.name, "sku": row.sku, "price": row.price} for row in accepted],
+        ).all()
+        images = [
+            {"item_id": item_id, "image_url": img.image_url}
+            for item_id, row in zip(ids, accepted)
+            for img in row.images
+        ]
+        if images:
+            db.execute(insert(ItemImage), images)
+            blobs = stored_blob_paths(db, [img["image_url"] for img in images])
+    return rejected, accepted, blobs
+
+@router.post("/import", response_model=ImportResult, openapi_extra=import_request_body(
+    "CSV with a header row (name,sku,price,images) or NDJSON of ItemCreate"
+))
+async def import_items(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults to the file extension or content type"),
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("import-items")),
+):
+    return await run_import(db, request, format, ItemCreate, _insert_items)
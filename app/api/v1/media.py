@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Request, Response
+from app.api.deps import get_token_principal
+from app.api.media import file_response
+
+router = APIRouter()
+
+@router.api_route("/{image_url:path}", methods=["GET", "HEAD"], response_class=Response, responses={
+    200: {"content": {"image/*": {}}, "description": "The file"},
+    206: {"description": "The requested byte range"},
+    304: {"description": "Not modified"},
+    416: {"description": "Range not satisfiable"},
+})
+async def get_media(image_url: str, request: Request, _=Depends(get_token_principal)):
+    """Serve an uploaded file by the image_url the API returned for it.
+
+    Blob URLs are content-addressed: the response is cacheable for good and
+    its ETag is the file name. Authenticates from the token claims alone, so
+    a page of thumbnails does not cost a users lookup per file.
+    """
+    return await file_response(request, image_url)
@@ -0,0 +1,116 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.db.session import DbSession, get_db
+from app.schemas.order import OrderCreate, OrderLineIn, OrderOut, OrderUpdate
+from app.models import Customer, Item, Order, OrderDetail
+from app.api.deps import permission_required, get_current_user
+from app.db.loading import select_for
+from app.api.pagination import keyset_page, next_page_headers, stream_json_array
+from app.core.config import PAGE_SIZE_MAX
+from app.core.reporting import apply_orders
+from app.core.serialization import rows_response
+
+router = APIRouter()
+
+# Writes are set-based: one SELECT prices every line, one INSERT adds them,
+# one UPDATE sums them into orders.total, all in the request's transaction
+# together with the reporting deltas.
+
+def _load(db: Session, order_id: int) -> Order:
+    order = db.scalars(select_for(Order, OrderOut).where(Order.id == order_id)).one_or_none()
+    if not order:
+        raise HTTPException(404, "Order not found")
+    return order
+
+def _insert_lines(db: Session, order_id: int, lines: List[OrderLineIn]) -> None:
+    item_ids = {line.item_id for line in lines}
+    prices = dict(db.execute(select(Item.id, Item.price).where(Item.id.in_(item_ids))).all())
+    unknown = sorted(item_ids - prices.keys())
+    if unknown:
+        raise HTTPException(400, f"Unknown items: {', '.join(map(str, unknown))}")
+    db.execute(insert(OrderDetail), [
+        {"order_id": order_id, "item_id": line.item_id, "quantity": line.quantity, "unit_price": prices[line.item_id]}
+        for line in lines
+    ])
+
+def _update_total(db: Session, order_id: int) -> None:
+    line_sum = (
+        select(func.coalesce(func.sum(OrderDetail.quantity * OrderDetail.unit_price), 0))
+        .where(OrderDetail.order_id == Order.id)
+        .scalar_subquery()
+    )
+    db.execute(update(Order).where(Order.id == order_id).values(total=line_sum))
+
+def _create_order(db: Session, payload: OrderCreate) -> Order:
+    if not db.get(Customer, payload.customer_id):
+        raise HTTPException(404, "Customer not found")
+    order_id = db.execute(
+        insert(Order).values(customer_id=payload.customer_id, status=payload.status, total=0).returning(Order.id)
+    ).scalar_one()
+    _insert_lines(db, order_id, payload.details)
+    _update_total(db, order_id)
+    apply_orders(db, Order.id == order_id)
+    db.commit()
+    return _load(db, order_id)
+
+@router.post("/", response_model=OrderOut)
+async def create_order(
+    payload: OrderCreate,
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("create-order")),
+):
+    return await db.run_sync(_create_order, payload)
+
+@router.get("/", response_model=List[OrderOut])
+async def list_orders(
+    request: Request,
+    customer_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor response header"),
+    stream: bool = Query(False, description="Stream all rows after the cursor instead of one page"),
+    db: DbSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    stmt = select_for(Order, OrderOut)
+    if customer_id is not None:
+        stmt = stmt.where(Order.customer_id == customer_id)
+    if stream:
+        return stream_json_array(stmt, Order.id, after, limit, OrderOut)
+    orders, next_cursor = await db.run_sync(keyset_page, stmt, Order.id, after, limit)
+    return rows_response(orders, OrderOut, next_page_headers(request, next_cursor))
+
+@router.get("/{order_id}", response_model=OrderOut)
+async def get_order(
+    order_id: int,
+    db: DbSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    return await db.run_sync(_load, order_id)
+
+def _update_order(db: Session, order_id: int, payload: OrderUpdate) -> Order:
+    # row lock first, so concurrent updates apply their reporting deltas in turn
+    if not db.execute(select(Order.id).where(Order.id == order_id).with_for_update()).first():
+        raise HTTPException(404, "Order not found")
+    if payload.status is None and payload.details is None:
+        return _load(db, order_id)
+    apply_orders(db, Order.id == order_id, sign=-1)
+    if payload.status is not None:
+        db.execute(update(Order).where(Order.id == order_id).values(status=payload.status))
+    if payload.details is not None:
+        db.execute(delete(OrderDetail).where(OrderDetail.order_id == order_id))
+        _insert_lines(db, order_id, payload.details)
+        _update_total(db, order_id)
+    apply_orders(db, Order.id == order_id)
+    db.commit()
+    return _load(db, order_id)
+
+@router.put("/{order_id}", response_model=OrderOut)
+async def update_order(
+    order_id: int,
+    payload: OrderUpdate,
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("update-order")),
+):
+    return await db.run_sync(_update_order, order_id, payload)
@@ -1,20 +1,19 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.dialect import insert_for
+from app.db.session import DbSession, get_db
 from app.models.permission import Permission
 from app.schemas.permission import PermissionCreate, PermissionOut
-from app.api.deps import get_current_user
+from app.api.deps import require_admin
+from app.core.permission_table import reload_permission_table
+from app.core.response_cache import cached_json
 from app.models.user import User
 
 router = APIRouter()
 
 # ---- helpers ----
-def require_admin(curr: User = Depends(get_current_user)) -> User:
-    if curr.role in ("admin", "superadmin"):
-        return curr
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
-
 def _normalize_csv(csv: str) -> str:
     # trim, dedupe, keep order
     seen = set()
@@ -25,13 +24,14 @@ def _normalize_csv(csv: str) -> str:
             out.append(g)
     return ",".join(out)
 
+def _get_or_404(db: Session, perm_id: int) -> Permission:
+    perm = db.get(Permission, perm_id)
+    if not perm:
+        raise HTTPException(404, "Permission not found")
+    return perm
+
 # ---- endpoints ----
-@router.post("/", response_model=PermissionOut)
-def create_permission(
-    payload: PermissionCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
-):
+def _create_permission(db: Session, payload: PermissionCreate) -> Permission:
     existing = db.query(Permission).filter(Permission.endpoint_name == payload.endpoint_name).first()
     if existing:
         raise HTTPException(400, "Permission for this endpoint already exists")
@@ -43,15 +43,18 @@ def create_permission(
     db.add(perm)
     db.commit()
     db.refresh(perm)
+    reload_permission_table(db)
     return perm
 
-@router.get("/", response_model=List[PermissionOut])
-def list_permissions(
-    module: Optional[str] = Query(None, description="Filter by module"),
-    q: Optional[str] = Query(None, description="Search in endpoint_name"),
-    db: Session = Depends(get_db),
+@router.post("/", response_model=PermissionOut)
+async def create_permission(
+    payload: PermissionCreate,
+    db: DbSession = Depends(get_db),
     _: User = Depends(require_admin),
 ):
+    return await db.run_sync(_create_permission, payload)
+
+def _list_permissions(db: Session, module: Optional[str], q: Optional[str]) -> List[Permission]:
     query = db.query(Permission)
     if module:
         query = query.filter(Permission.module == module)
@@ -59,16 +62,26 @@ def list_permissions(
         query = query.filter(Permission.endpoint_name.ilike(f"%{q}%"))
     return query.order_by(Permission.module.asc(), Permission.endpoint_name.asc()).all()
 
+@router.get("/", response_model=List[PermissionOut])
+async def list_permissions(
+    request: Request,
+    module: Optional[str] = Query(None, description="Filter by module"),
+    q: Optional[str] = Query(None, description="Search in endpoint_name"),
+    db: DbSession = Depends(get_db),
+    _: User = Depends(require_admin),
+):
+    async def build():
+        return await db.run_sync(_list_permissions, module, q), {}
+
+    return await cached_json(request, ("permissions",), PermissionOut, build)
+
 @router.get("/{perm_id}", response_model=PermissionOut)
-def get_permission(
+async def get_permission(
     perm_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     _: User = Depends(require_admin),
 ):
-    perm = db.get(Permission, perm_id)
-    if not perm:
-        raise HTTPException(404, "Permission not found")
-    return perm
+    return await db.run_sync(_get_or_404, perm_id)
 
 # simple update schema inline to avoid changing shared schemas
 from pydantic import BaseModel
@@ -77,16 +90,8 @@ class PermissionUpdate(BaseModel):
     endpoint_name: Optional[str] = None
     allowed_groups: Optional[str] = None
 
-@router.put("/{perm_id}", response_model=PermissionOut)
-def update_permission(
-    perm_id: int,
-    payload: PermissionUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
-):
-    perm = db.get(Permission, perm_id)
-    if not perm:
-        raise HTTPException(404, "Permission not found")
+def _update_permission(db: Session, perm_id: int, payload: PermissionUpdate) -> Permission:
+    perm = _get_or_404(db, perm_id)
 
     if payload.endpoint_name and payload.endpoint_name != perm.endpoint_name:
         # ensure uniqueness
@@ -103,45 +108,69 @@ def update_permission(
 
     db.commit()
     db.refresh(perm)
+    reload_permission_table(db)
     return perm
 
-@router.delete("/{perm_id}", status_code=204)
-def delete_permission(
+@router.put("/{perm_id}", response_model=PermissionOut)
+async def update_permission(
     perm_id: int,
-    db: Session = Depends(get_db),
+    payload: PermissionUpdate,
+    db: DbSession = Depends(get_db),
     _: User = Depends(require_admin),
 ):
-    perm = db.get(Permission, perm_id)
-    if not perm:
-        raise HTTPException(404, "Permission not found")
+    return await db.run_sync(_update_permission, perm_id, payload)
+
+def _delete_permission(db: Session, perm_id: int) -> None:
+    perm = _get_or_404(db, perm_id)
     db.delete(perm)
     db.commit()
+    reload_permission_table(db)
+
+@router.delete("/{perm_id}", status_code=204)
+async def delete_permission(
+    perm_id: int,
+    db: DbSession = Depends(get_db),
+    _: User = Depends(require_admin),
+):
+    await db.run_sync(_delete_permission, perm_id)
     return None
 
 # Optional bulk upsert for convenience
 class PermissionBulkIn(BaseModel):
     permissions: List[PermissionCreate]
+    replace_all: bool = False  # also delete permissions whose endpoint is not in the payload
+
+def _bulk_upsert_permissions(db: Session, payload: PermissionBulkIn) -> List[PermissionOut]:
+    # one row per endpoint (last entry wins): ON CONFLICT cannot touch a row twice
+    rows = {
+        p.endpoint_name: {
+            "module": p.module,
+            "endpoint_name": p.endpoint_name,
+            "allowed_groups": _normalize_csv(p.allowed_groups),
+        }
+        for p in payload.permissions
+    }
+    if payload.replace_all:
+        db.execute(delete(Permission).where(Permission.endpoint_name.not_in(rows)))
+    out: List[PermissionOut] = []
+    if rows:
+        stmt = insert_for(db, Permission).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Permission.endpoint_name],
+            set_={"module": stmt.excluded.module, "allowed_groups": stmt.excluded.allowed_groups},
+        )
+        returned = db.scalars(stmt.returning(Permission), execution_options={"populate_existing": True})
+        # serialized before commit expires them, so the response needs no refresh per row
+        order = {name: i for i, name in enumerate(rows)}
+        out = sorted((PermissionOut.model_validate(p) for p in returned), key=lambda p: order[p.endpoint_name])
+    db.commit()
+    reload_permission_table(db)
+    return out
 
 @router.post("/bulk", response_model=List[PermissionOut])
-def bulk_upsert_permissions(
+async def bulk_upsert_permissions(
     payload: PermissionBulkIn,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     _: User = Depends(require_admin),
 ):
-    out: List[Permission] = []
-    for p in payload.permissions:
-        norm_groups = _normalize_csv(p.allowed_groups)
-        existing = db.query(Permission).filter(Permission.endpoint_name == p.endpoint_name).first()
-        if existing:
-            existing.module = p.module
-            existing.allowed_groups = norm_groups
-            db.add(existing)
-            out.append(existing)
-        else:
-            newp = Permission(module=p.module, endpoint_name=p.endpoint_name, allowed_groups=norm_groups)
-            db.add(newp)
-            out.append(newp)
-    db.commit()
-    for p in out:
-        db.refresh(p)
-    return out
+    return await db.run_sync(_bulk_upsert_permissions, payload)
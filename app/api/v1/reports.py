@@ -0,0 +1,50 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.session import DbSession, get_db
+from app.api.deps import permission_required
+from app.models import CustomerSpend, DailySales, ItemSales
+from app.schemas.report import CustomerSpendOut, DailySalesOut, ItemSalesOut
+
+router = APIRouter()
+
+# Every endpoint reads one small summary table by its primary key or an
+# index; none of them touch orders or order_details.
+
+def _daily_sales(db: Session, start: Optional[date], end: Optional[date]) -> List[DailySales]:
+    stmt = select(DailySales).where(DailySales.orders != 0)
+    if start:
+        stmt = stmt.where(DailySales.day >= start)
+    if end:
+        stmt = stmt.where(DailySales.day <= end)
+    return db.scalars(stmt.order_by(DailySales.day)).all()
+
+@router.get("/daily-sales", response_model=List[DailySalesOut])
+async def daily_sales(
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("view-reports")),
+):
+    return await db.run_sync(_daily_sales, start, end)
+
+def _top(db: Session, column, limit: int) -> list:
+    return db.scalars(select(column.class_).where(column != 0).order_by(column.desc()).limit(limit)).all()
+
+@router.get("/top-items", response_model=List[ItemSalesOut])
+async def top_items(
+    limit: int = Query(20, ge=1, le=1000),
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("view-reports")),
+):
+    return await db.run_sync(_top, ItemSales.revenue, limit)
+
+@router.get("/top-customers", response_model=List[CustomerSpendOut])
+async def top_customers(
+    limit: int = Query(20, ge=1, le=1000),
+    db: DbSession = Depends(get_db),
+    _=Depends(permission_required("view-reports")),
+):
+    return await db.run_sync(_top, CustomerSpend.spend, limit)
@@ -0,0 +1,197 @@
+import mimetypes
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.db.session import DbSession, get_db
+from app.models import Customer, CustomerImage, Item, ItemImage, UploadSession
+from app.schemas.upload import UploadCompleteOut, UploadSessionCreate, UploadSessionOut
+from app.api.deps import check_permission, get_current_user
+from app.api.uploads import (
+    StoredBlob,
+    create_partial,
+    format_ranges,
+    merge_range,
+    parse_ranges,
+    publish_partial,
+    register_blobs,
+    remove_partial,
+    write_range,
+)
+from app.core.config import UPLOAD_SESSION_MAX_BYTES, UPLOAD_SESSION_TTL_SECONDS
+from app.core.derivatives import enqueue_derivatives
+
+# Resumable uploads: POST a session, PUT its bytes in as many Content-Range
+# chunks as the connection allows (in any order, retrying whatever is
+# missing), then POST /complete to attach the file to its customer or item.
+
+router = APIRouter()
+
+# target -> (parent model, image model, image foreign key, permission)
+_TARGETS = {
+    "customer": (Customer, CustomerImage, "customer_id", "customer-upload-images"),
+    "item": (Item, ItemImage, "item_id", "item-upload-images"),
+}
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+def _out(session: UploadSession) -> UploadSessionOut:
+    received = parse_ranges(session.received)
+    return UploadSessionOut(
+        id=session.id,
+        target=session.target,
+        target_id=session.target_id,
+        filename=session.filename,
+        size=session.size,
+        received=[list(span) for span in received],
+        complete=received == [(0, session.size)],
+        expires_at=session.updated_at + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+    )
+
+def _owned(db: Session, session_id: str, user_id: int) -> UploadSession:
+    session = db.get(UploadSession, session_id)
+    if session is None or session.user_id != user_id:
+        raise HTTPException(404, "Upload session not found")
+    return session
+
+def _check_target(db: Session, target: str, target_id: int) -> None:
+    if db.get(_TARGETS[target][0], target_id) is None:
+        raise HTTPException(404, f"{target.capitalize()} not found")
+
+def _create_session(db: Session, session_id: str, user_id: int, payload: UploadSessionCreate) -> UploadSessionOut:
+    _check_target(db, payload.target, payload.target_id)
+    session = UploadSession(
+        id=session_id,
+        user_id=user_id,
+        target=payload.target,
+        target_id=payload.target_id,
+        filename=os.path.basename(payload.filename),
+        size=payload.size,
+        received="",
+        updated_at=datetime.utcnow(),
+    )
+    db.add(session)
+    out = _out(session)
+    db.commit()
+    return out
+
+@router.post("/", response_model=UploadSessionOut, status_code=201)
+async def create_upload(
+    payload: UploadSessionCreate,
+    db: DbSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    await check_permission(current_user, _TARGETS[payload.target][3], db)
+    if payload.size > UPLOAD_SESSION_MAX_BYTES:
+        raise HTTPException(413, f"Uploads are limited to {UPLOAD_SESSION_MAX_BYTES} bytes")
+    session_id = uuid.uuid4().hex
+    await run_in_threadpool(create_partial, session_id, payload.size)
+    try:
+        return await db.run_sync(_create_session, session_id, current_user.id, payload)
+    except BaseException:
+        await run_in_threadpool(remove_partial, session_id)
+        raise
+
+@router.get("/{session_id}", response_model=UploadSessionOut)
+async def get_upload(session_id: str, db: DbSession = Depends(get_db), current_user=Depends(get_current_user)):
+    """The byte ranges stored so far: resume by sending what is missing."""
+    return _out(await db.run_sync(_owned, session_id, current_user.id))
+
+def _detach(db: Session, session: UploadSession) -> None:
+    # end the transaction, so no pooled connection is held while a chunk streams in
+    db.expunge(session)
+    db.rollback()
+
+def _record(db: Session, session_id: str, start: int, end: int) -> UploadSessionOut:
+    session = db.get(UploadSession, session_id, with_for_update=True)  # concurrent chunks merge in turn
+    if session is None:
+        raise HTTPException(404, "Upload session not found")
+    if end > start:
+        session.received = format_ranges(merge_range(parse_ranges(session.received), start, end))
+    session.updated_at = datetime.utcnow()
+    out = _out(session)
+    db.commit()
+    return out
+
+@router.put("/{session_id}", response_model=UploadSessionOut)
+async def put_chunk(
+    session_id: str,
+    request: Request,
+    content_range: str = Header(..., description="bytes <first>-<last>/<size>, as in a 206 response"),
+    db: DbSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Store the request body at the offset its Content-Range names.
+
+    Bytes are written to disk as they arrive; if the connection drops, the
+    part that made it is kept and shows up in the session's ranges.
+    """
+    user_id = current_user.id
+    session = await db.run_sync(_owned, session_id, user_id)
+    m = _CONTENT_RANGE.fullmatch(content_range.strip())
+    if not m:
+        raise HTTPException(400, "Content-Range must be 'bytes <first>-<last>/<size>'")
+    first, last, total = (int(n) for n in m.groups())
+    if total != session.size or first > last or last >= session.size:
+        raise HTTPException(416, "Range outside the upload", headers={"Content-Range": f"bytes */{session.size}"})
+    await db.run_sync(_detach, session)
+    try:
+        written, overflow = await write_range(session_id, first, last - first + 1, request.stream())
+    except FileNotFoundError:
+        raise HTTPException(404, "Upload session not found")  # swept meanwhile
+    out = await db.run_sync(_record, session_id, first, first + written)
+    if overflow:
+        raise HTTPException(400, "Body is longer than its Content-Range")
+    return out
+
+def _ready(db: Session, session_id: str, user_id: int) -> UploadSession:
+    session = _owned(db, session_id, user_id)
+    if parse_ranges(session.received) != [(0, session.size)]:
+        raise HTTPException(409, "Upload is incomplete")
+    _check_target(db, session.target, session.target_id)
+    return session
+
+def _attach(db: Session, session: UploadSession, blob: StoredBlob) -> int:
+    _, image_model, foreign_key, _ = _TARGETS[session.target]
+    register_blobs(db, [blob])
+    image_id = db.execute(
+        insert(image_model).values({foreign_key: session.target_id, "image_url": blob.path}).returning(image_model.id)
+    ).scalar_one()
+    db.execute(delete(UploadSession).where(UploadSession.id == session.id))
+    db.commit()
+    return image_id
+
+@router.post("/{session_id}/complete", response_model=UploadCompleteOut)
+async def complete_upload(session_id: str, db: DbSession = Depends(get_db), current_user=Depends(get_current_user)):
+    """Move a fully received upload into the blob store and attach it to its customer or item."""
+    session = await db.run_sync(_ready, session_id, current_user.id)
+    await check_permission(current_user, _TARGETS[session.target][3], db)
+    await db.run_sync(_detach, session)  # hashing a large file takes a while
+    try:
+        blob = await run_in_threadpool(publish_partial, session.id, session.filename)
+    except FileNotFoundError:
+        raise HTTPException(409, "Upload is already being completed")
+    image_id = await db.run_sync(_attach, session, blob)
+    if (mimetypes.guess_type(session.filename)[0] or "").startswith("image/"):
+        enqueue_derivatives([blob.path])
+    return UploadCompleteOut(
+        target=session.target,
+        target_id=session.target_id,
+        image_id=image_id,
+        image_url=blob.path,
+        digest=blob.digest,
+        size=blob.size,
+    )
+
+def _delete_session(db: Session, session_id: str, user_id: int) -> None:
+    db.delete(_owned(db, session_id, user_id))
+    db.commit()
+
+@router.delete("/{session_id}", status_code=204)
+async def abort_upload(session_id: str, db: DbSession = Depends(get_db), current_user=Depends(get_current_user)):
+    await db.run_sync(_delete_session, session_id, current_user.id)
+    await run_in_threadpool(remove_partial, session_id)
+    return Response(status_code=204)
@@ -1,37 +1,134 @@
 import os
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 
-# Load variables from .env into environment
-load_dotenv()
+# Settings come from the environment, then from a .env file. Reading the file
+# leaves os.environ untouched, and importing this module has no other effects.
+_env = {**dotenv_values(), **os.environ}
+
+def _getenv(name: str, default=None):
+    return _env.get(name, default)
 
 # Database
-POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
-POSTGRES_DB = os.getenv("POSTGRES_DB", "fastapi_rbac")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+# Create missing tables when the app starts (dev/demo). Turn off in production
+# and run `python -m app.schema create` as a deploy step instead.
+DB_CREATE_SCHEMA = _getenv("DB_CREATE_SCHEMA", "true").lower() in ("1", "true", "yes")
+POSTGRES_USER = _getenv("POSTGRES_USER", "postgres")
+POSTGRES_PASSWORD = _getenv("POSTGRES_PASSWORD", "postgres")
+POSTGRES_DB = _getenv("POSTGRES_DB", "fastapi_rbac")
+POSTGRES_HOST = _getenv("POSTGRES_HOST", "localhost")
+POSTGRES_PORT = _getenv("POSTGRES_PORT", "5432")
 
-DATABASE_URL = (
+DATABASE_URL = _getenv("DATABASE_URL") or (
     f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}"
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+# Serve requests from the asyncpg engine instead of psycopg2 on the threadpool.
+# Both run the same handlers, so the two can be compared side by side.
+DB_ASYNC = _getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = _getenv("ASYNC_DATABASE_URL") or (
+    DATABASE_URL
+    .replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    .replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# Connection pool (applies to both engines; SQLite in-memory databases keep their default pool)
+DB_POOL_SIZE = int(_getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(_getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(_getenv("DB_POOL_TIMEOUT", "10"))
+# Recycling retires connections before server/proxy idle timeouts, which makes
+# a ping on every checkout unnecessary in most deployments.
+DB_POOL_RECYCLE = int(_getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
 # JWT
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecretkey_change_me")
+JWT_SECRET_KEY = _getenv("JWT_SECRET_KEY", "supersecretkey_change_me")
 JWT_ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(_getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_MINUTES = int(
-    os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", str(60 * 24 * 7))
+    _getenv("REFRESH_TOKEN_EXPIRE_MINUTES", str(60 * 24 * 7))
 )
+# Refresh tokens are rows keyed by jti, with revoked jtis mirrored in memory. Each worker loads
+# revocations made elsewhere every REFRESH_TOKEN_SYNC_SECONDS and purges expired rows every
+# REFRESH_TOKEN_PURGE_SECONDS (0 = no background task).
+REFRESH_TOKEN_SYNC_SECONDS = int(_getenv("REFRESH_TOKEN_SYNC_SECONDS", "30"))
+REFRESH_TOKEN_PURGE_SECONDS = int(_getenv("REFRESH_TOKEN_PURGE_SECONDS", "3600"))
+# Trust identity claims in access tokens instead of loading the user on every request.
+# Revocation is checked against users.security_version, cached for the TTL below.
+AUTH_STATELESS = _getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+AUTH_VERSION_CACHE_TTL_SECONDS = int(_getenv("AUTH_VERSION_CACHE_TTL_SECONDS", "30"))
+
+# Password hashing (bcrypt runs in its own process pool; changing the rounds rehashes on next login)
+BCRYPT_ROUNDS = int(_getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(_getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(_getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
 
 # API
-API_PREFIX = os.getenv("API_PREFIX", "/api/v1")
+API_PREFIX = _getenv("API_PREFIX", "/api/v1")
+
+# Pagination (keyset on id; streamed lists are fetched in keyset batches of STREAM_BATCH_SIZE rows)
+PAGE_SIZE_DEFAULT = int(_getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(_getenv("PAGE_SIZE_MAX", "1000"))
+STREAM_BATCH_SIZE = int(_getenv("STREAM_BATCH_SIZE", "500"))
+
+# Search (ranked fuzzy lookup; results are always capped)
+SEARCH_LIMIT_DEFAULT = int(_getenv("SEARCH_LIMIT_DEFAULT", "20"))
+SEARCH_LIMIT_MAX = int(_getenv("SEARCH_LIMIT_MAX", "50"))
+
+# Bulk import (rows are validated and inserted this many at a time, one commit per batch)
+IMPORT_BATCH_SIZE = int(_getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(_getenv("IMPORT_MAX_ERRORS", "1000"))  # rows reported individually
+
+# Reporting (orders in these statuses are left out of the sales summaries)
+REPORT_EXCLUDED_STATUSES = [s.strip() for s in _getenv("REPORT_EXCLUDED_STATUSES", "cancelled").split(",") if s.strip()]
+
+# Response cache for polled GET endpoints (serialized bodies, LRU-evicted past the byte cap).
+# Writes in this process invalidate at once; the TTL bounds staleness from other workers (0 = no TTL).
+RESPONSE_CACHE_MAX_BYTES = int(_getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SECONDS = int(_getenv("RESPONSE_CACHE_TTL_SECONDS", "10"))
+
+# List responses are encoded straight from ORM rows with orjson (when installed) instead of
+# validating every row into its pydantic schema first; false = the plain pydantic path.
+RESPONSE_FAST_JSON = _getenv("RESPONSE_FAST_JSON", "true").lower() in ("1", "true", "yes")
+
+# Request profiling (opt-in): Server-Timing header and per-route latency histograms.
+# PROFILE_SLOWEST > 0 also runs a sample of requests under cProfile and keeps the N slowest in PROFILE_DIR.
+PROFILING_ENABLED = _getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SLOWEST = int(_getenv("PROFILE_SLOWEST", "0"))
+PROFILE_SAMPLE_RATE = float(_getenv("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_DIR = _getenv("PROFILE_DIR", "profiles")
+
+# Permissions (compiled table is reloaded on writes and at most this often otherwise; 0 = only on writes)
+PERMISSION_TABLE_TTL_SECONDS = int(_getenv("PERMISSION_TABLE_TTL_SECONDS", "300"))
 
 # File uploads
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_DIR = _getenv("UPLOAD_DIR", "uploads")
 CUSTOMER_UPLOAD_SUBDIR = "customers"
 ITEM_UPLOAD_SUBDIR = "items"
+BLOB_SUBDIR = "blobs"  # content-addressed store shared by all uploads
+DERIVED_SUBDIR = "derived"  # thumbnails rendered from blobs, same layout
+UPLOAD_CHUNK_SIZE = int(_getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_FILES = int(_getenv("UPLOAD_MAX_FILES", "20"))
+UPLOAD_MAX_FILE_BYTES = int(_getenv("UPLOAD_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(_getenv("UPLOAD_MAX_REQUEST_BYTES", str(100 * 1024 * 1024)))
+INCOMING_SUBDIR = "incoming"  # files of a multipart upload until the whole request has passed
+
+# Resumable uploads (create a session, PUT byte ranges in any order, complete). Partial files live
+# in UPLOAD_DIR/partial; sessions idle for UPLOAD_SESSION_TTL_SECONDS are swept with their data
+# every UPLOAD_SESSION_GC_INTERVAL_SECONDS (0 = no background sweep).
+PARTIAL_SUBDIR = "partial"
+UPLOAD_SESSION_MAX_BYTES = int(_getenv("UPLOAD_SESSION_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS = int(_getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+UPLOAD_SESSION_GC_INTERVAL_SECONDS = int(_getenv("UPLOAD_SESSION_GC_INTERVAL_SECONDS", "600"))
+
+# Serving uploads (GET /api/v1/media/<image_url>). Bodies go out through the server's zero-copy
+# extension when it offers one, else in MEDIA_CHUNK_SIZE reads. MEDIA_ACCEL_REDIRECT hands them to
+# nginx instead (X-Accel-Redirect): set it to an internal location that aliases UPLOAD_DIR.
+MEDIA_CHUNK_SIZE = int(_getenv("MEDIA_CHUNK_SIZE", str(256 * 1024)))
+MEDIA_ACCEL_REDIRECT = _getenv("MEDIA_ACCEL_REDIRECT", "")
 
-# Ensure folders exist
-os.makedirs(os.path.join(UPLOAD_DIR, CUSTOMER_UPLOAD_SUBDIR), exist_ok=True)
-os.makedirs(os.path.join(UPLOAD_DIR, ITEM_UPLOAD_SUBDIR), exist_ok=True)
+# Image derivatives (thumbnails rendered off the request path in a process pool)
+DERIVATIVES_ENABLED = _getenv("DERIVATIVES_ENABLED", "true").lower() in ("1", "true", "yes")
+DERIVATIVE_SIZES = [int(s) for s in _getenv("DERIVATIVE_SIZES", "160,640").split(",") if s.strip()]
+DERIVATIVE_FORMAT = _getenv("DERIVATIVE_FORMAT", "webp")
+DERIVATIVE_WORKERS = int(_getenv("DERIVATIVE_WORKERS", str(min(2, os.cpu_count() or 1))))
@@ -0,0 +1,154 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import (
+    UPLOAD_DIR,
+    BLOB_SUBDIR,
+    DERIVED_SUBDIR,
+    DERIVATIVES_ENABLED,
+    DERIVATIVE_FORMAT,
+    DERIVATIVE_SIZES,
+    DERIVATIVE_WORKERS,
+)
+
+try:  # optional: without Pillow uploads simply get no derivatives
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+log = logging.getLogger(__name__)
+
+def derivative_path(image_url: str, size: int) -> str:
+    """Relative path of the `size` px rendition of an uploaded image."""
+    stem = os.path.splitext(image_url)[0]
+    return os.path.join(DERIVED_SUBDIR, f"{stem}_{size}.{DERIVATIVE_FORMAT}")
+
+# ---- worker side (runs in the process pool) ----
+def render(src: str, targets: List[Tuple[int, str]]) -> List[int]:
+    """Write each missing (size, dest) rendition of `src`; return the sizes now on disk."""
+    todo = [(size, dest) for size, dest in targets if not os.path.exists(dest)]
+    if todo:
+        with Image.open(src) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGB")
+            for size, dest in sorted(todo, reverse=True):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                im.thumbnail((size, size))  # each pass shrinks the previous, largest first
+                part = f"{dest}.{uuid.uuid4().hex}.part"
+                im.save(part, format=DERIVATIVE_FORMAT, quality=80, method=4)
+                os.replace(part, dest)
+    return [size for size, _ in targets]
+
+# ---- app side ----
+# Pool callbacks only hand results over: a single writer thread marks the
+# rendered sizes in the database, in batches, off the executor's threads.
+_executor: Optional[ProcessPoolExecutor] = None
+_writer: Optional[threading.Thread] = None
+_results: "queue.SimpleQueue[Optional[Tuple[str, Future]]]" = queue.SimpleQueue()
+_lock = threading.Lock()  # guards _queued and _stats
+_queued: set = set()  # image_urls with a job in flight or a result not yet written
+_stats: Dict[str, int] = {"completed": 0, "failed": 0}
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _writer
+    with _lock:
+        if _executor is None:
+            # spawn: forking a process that runs an event loop and threads is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _writer = threading.Thread(target=_write_results, name="derivative-writer", daemon=True)
+            _writer.start()
+        return _executor
+
+def _mark_ready(ready: Dict[str, List[int]]) -> None:
+    from sqlalchemy import bindparam, update
+    from app.db.session import SessionLocal
+    from app.models import CustomerImage, ItemImage
+
+    params = [{"d_url": url, "d_sizes": ",".join(str(s) for s in sizes)} for url, sizes in ready.items()]
+    db = SessionLocal()
+    try:
+        for model in (CustomerImage, ItemImage):
+            table = model.__table__
+            db.execute(
+                update(table).where(table.c.image_url == bindparam("d_url")).values(derivatives=bindparam("d_sizes")),
+                params,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+def _write_results() -> None:
+    while True:
+        item = _results.get()
+        batch = [item]
+        while item is not None and not _results.empty():  # whatever finished meanwhile goes in the same transaction
+            item = _results.get()
+            batch.append(item)
+        ready, failed = {}, 0
+        for image_url, fut in filter(None, batch):
+            if fut.cancelled():  # shutdown
+                continue
+            try:
+                ready[image_url] = fut.result()
+            except Exception:
+                failed += 1
+                log.exception("derivative generation failed for %s", image_url)
+        if ready:
+            try:
+                _mark_ready(ready)
+            except Exception:
+                failed, ready = failed + len(ready), {}
+                log.exception("recording derivatives failed")
+        with _lock:
+            _queued.difference_update(image_url for image_url, _ in filter(None, batch))
+            _stats["completed"] += len(ready)
+            _stats["failed"] += failed
+        if batch[-1] is None:
+            return
+
+def _done(image_url: str, fut: Future) -> None:
+    _results.put((image_url, fut))  # runs on the executor's thread: no I/O here
+
+def enqueue_derivatives(image_urls: Iterable[str]) -> None:
+    """Schedule thumbnails for blob paths known to be stored (register_blobs / stored_blob_paths); returns immediately."""
+    if not DERIVATIVES_ENABLED or Image is None:
+        return
+    for url in image_urls:
+        if not url.startswith(BLOB_SUBDIR + "/"):
+            continue  # external or legacy URL, nothing on disk to render
+        with _lock:
+            if url in _queued:
+                continue
+            _queued.add(url)
+        targets = [(size, os.path.join(UPLOAD_DIR, derivative_path(url, size))) for size in DERIVATIVE_SIZES]
+        fut = _get_executor().submit(render, os.path.join(UPLOAD_DIR, url), targets)
+        fut.add_done_callback(lambda f, url=url: _done(url, f))
+
+def derivative_stats() -> Dict[str, int]:
+    with _lock:
+        return {"queue_depth": len(_queued), "workers": DERIVATIVE_WORKERS, **_stats}
+
+def check_derivatives() -> None:
+    """Log once (from the lifespan) when thumbnails are enabled but Pillow is missing."""
+    if DERIVATIVES_ENABLED and Image is None:
+        log.warning("Pillow is not installed: uploads get no thumbnails")
+
+def shutdown_derivatives() -> None:
+    global _executor, _writer
+    with _lock:
+        executor, _executor = _executor, None
+        writer, _writer = _writer, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if writer is not None:
+        _results.put(None)
+        writer.join(timeout=5)  # record what already finished before the engines are disposed
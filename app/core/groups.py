@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import Session
+from app.db.dialect import insert_for
+from app.models import Group, UserGroup
+
+# Set-based group membership writes shared by registration and the admin API.
+# None of these commit; callers reload the permission table after committing
+# when resolve_groups created groups.
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    seen = set()
+    out = []
+    for name in (n.strip() for n in names):
+        if name and name not in seen:
+            seen.add(name)
+            out.append(name)
+    return out
+
+def resolve_groups(db: Session, names: List[str]) -> Tuple[Dict[str, int], List[str]]:
+    """(name -> id for every name, names of the groups that had to be created)."""
+    if not names:
+        return {}, []
+    ids = dict(db.execute(select(Group.name, Group.id).where(Group.name.in_(names))).all())
+    missing = [n for n in names if n not in ids]
+    if not missing:
+        return ids, []
+    stmt = insert_for(db, Group).values([{"name": n} for n in missing]).on_conflict_do_nothing(index_elements=[Group.name])
+    created = dict(db.execute(stmt.returning(Group.name, Group.id)).all())
+    ids.update(created)
+    if len(ids) < len(names):
+        # lost a race with a concurrent insert of the same names; they exist now
+        late = [n for n in names if n not in ids]
+        ids.update(db.execute(select(Group.name, Group.id).where(Group.name.in_(late))).all())
+    return ids, [n for n in missing if n in created]
+
+def link_groups(
+    db: Session, user_ids: Iterable[int], group_ids: Iterable[int], new_users: bool = False
+) -> Set[Tuple[int, int]]:
+    """Add missing user_groups links in one INSERT; returns the (user_id, group_id) pairs added.
+
+    new_users skips the lookup of existing links (the users were just created).
+    """
+    group_ids = list(group_ids)
+    pairs = {(u, g) for u in user_ids for g in group_ids}
+    if not pairs:
+        return set()
+    if not new_users:
+        existing = db.execute(
+            select(UserGroup.user_id, UserGroup.group_id)
+            .where(tuple_(UserGroup.user_id, UserGroup.group_id).in_(pairs))
+        ).all()
+        pairs -= set(map(tuple, existing))
+    if pairs:
+        db.execute(insert(UserGroup), [{"user_id": u, "group_id": g} for u, g in pairs])
+    return pairs
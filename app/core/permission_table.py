@@ -0,0 +1,32 @@
+import time
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional
+from sqlalchemy.orm import Session
+from app.core.config import PERMISSION_TABLE_TTL_SECONDS
+from app.models.group import Group
+from app.models.permission import Permission
+
+# endpoint_name -> allowed group ids. Never mutated, only swapped for a new
+# version, so readers on any thread always see a complete table.
+_table: Optional[Mapping[str, FrozenSet[int]]] = None
+_loaded_at = 0.0
+
+def compile_permission_table(db: Session) -> Mapping[str, FrozenSet[int]]:
+    group_ids = dict(db.query(Group.name, Group.id).all())
+    table = {}
+    for endpoint_name, allowed_groups in db.query(Permission.endpoint_name, Permission.allowed_groups):
+        names = (g.strip() for g in allowed_groups.split(","))
+        table[endpoint_name] = frozenset(group_ids[n] for n in names if n in group_ids)
+    return MappingProxyType(table)
+
+def reload_permission_table(db: Session) -> Mapping[str, FrozenSet[int]]:
+    global _table, _loaded_at
+    table = compile_permission_table(db)
+    _table, _loaded_at = table, time.monotonic()
+    return table
+
+def cached_permission_table() -> Optional[Mapping[str, FrozenSet[int]]]:
+    """The current table, or None when it has to be (re)loaded from the database."""
+    expired = PERMISSION_TABLE_TTL_SECONDS and time.monotonic() - _loaded_at > PERMISSION_TABLE_TTL_SECONDS
+    # other workers may have changed permissions; the TTL bounds how long we miss it
+    return None if expired else _table
@@ -0,0 +1,46 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.core.config import AUTH_VERSION_CACHE_TTL_SECONDS
+from app.models.user import User
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller rebuilt from access token claims, without a users lookup."""
+    id: int
+    username: str
+    role: str
+    group_ids: FrozenSet[int]
+
+# user id -> (security_version, expires_at)
+_versions: Dict[int, Tuple[Optional[int], float]] = {}
+
+def cached_security_version(user_id: int) -> Tuple[bool, Optional[int]]:
+    """(hit, version) from the in-process cache, without touching the database."""
+    cached = _versions.get(user_id)
+    if cached and cached[1] > time.monotonic():
+        return True, cached[0]
+    return False, None
+
+def load_security_version(db: Session, user_id: int) -> Optional[int]:
+    version = db.query(User.security_version).filter(User.id == user_id).scalar()
+    _versions[user_id] = (version, time.monotonic() + AUTH_VERSION_CACHE_TTL_SECONDS)
+    return version
+
+def forget_security_version(user_id: int) -> None:
+    _versions.pop(user_id, None)
+
+def bump_security_version(db: Session, user_ids: Iterable[int]) -> None:
+    """Invalidate outstanding access tokens after a role or group change; caller commits."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(security_version=User.security_version + 1)
+    )
+    for uid in user_ids:
+        forget_security_version(uid)
@@ -0,0 +1,251 @@
+import asyncio
+import cProfile
+import heapq
+import itertools
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from app.core.config import PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_SLOWEST, PROFILING_ENABLED
+from app.db.metrics import request_tally, route_label
+
+# Opt-in (PROFILING_ENABLED) per-request timing. Each request is split into
+#   deps       body parsing and dependency resolution (auth, session, permissions)
+#   handler    the endpoint function
+#   serialize  response_model validation and rendering, up to the response headers
+#   sql        statements issued during the request (overlaps the phases above)
+# which are sent back in a Server-Timing header and summed per route next to
+# a latency histogram. With PROFILE_SLOWEST > 0, a PROFILE_SAMPLE_RATE share
+# of requests (one at a time) also runs under cProfile, and the profiles of
+# the slowest N are kept in PROFILE_DIR for `python -m pstats` / snakeviz.
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_PHASES = ("deps", "handler", "serialize", "sql")
+
+class _Marks:
+    __slots__ = ("start", "route_start", "call_start", "call_end", "headers_at")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.route_start = self.call_start = self.call_end = self.headers_at = None
+
+    def phases(self) -> Dict[str, float]:
+        """Seconds per phase; phases the request never reached count as 0."""
+        def span(a, b):
+            return b - a if a is not None and b is not None else 0.0
+        tally = request_tally()
+        return {
+            # a dependency that raises (401/403) ends the request before the handler
+            "deps": span(self.route_start, self.call_start or self.headers_at),
+            "handler": span(self.call_start, self.call_end),
+            "serialize": span(self.call_end, self.headers_at),
+            "sql": tally.seconds if tally is not None else 0.0,
+        }
+
+class _RouteTimings:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.requests = 0
+        self.seconds = 0.0
+        self.phases = dict.fromkeys(_PHASES, 0.0)
+
+_lock = threading.Lock()
+_routes: Dict[str, _RouteTimings] = {}
+_marks: ContextVar[Optional[_Marks]] = ContextVar("profile_marks", default=None)
+_sample: ContextVar[Optional[list]] = ContextVar("profile_sample", default=None)
+_sampling = False
+_kept: List[Tuple[float, str, str]] = []  # min-heap of (seconds, route, path)
+_seq = itertools.count()
+
+# ---- phase marks, set from wrappers installed on every APIRoute ----
+def _timed_app(app):
+    async def timed(scope, receive, send):
+        marks = _marks.get()
+        if marks is not None:
+            marks.route_start = time.perf_counter()
+        await app(scope, receive, send)
+    return timed
+
+def _timed_call(call):
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def timed(*args, **kwargs):
+            marks = _marks.get()
+            if marks is None:
+                return await call(*args, **kwargs)
+            marks.call_start = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                marks.call_end = time.perf_counter()
+    else:
+        @wraps(call)
+        def timed(*args, **kwargs):  # runs in the threadpool
+            marks = _marks.get()
+            if marks is None:
+                return call(*args, **kwargs)
+            marks.call_start = time.perf_counter()
+            try:
+                return profile_thread(call, *args, **kwargs)
+            finally:
+                marks.call_end = time.perf_counter()
+    return timed
+
+def instrument_routes(app) -> None:
+    """Wrap every API route so requests can be split into phases; call after include_router."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route, "_profiled", False):
+            # the request handler reads dependant.call on every request
+            route.dependant.call = _timed_call(route.dependant.call)
+            route.app = _timed_app(route.app)
+            route._profiled = True
+
+# ---- cProfile sampling ----
+def profile_thread(fn, *args, **kwargs):
+    """Call fn; if the current request is being sampled, profile it into the sample.
+
+    cProfile only sees the thread that enabled it, so work handed to the
+    threadpool is profiled there and merged into the request's profile.
+    """
+    profiles = _sample.get()
+    if profiles is None:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler owns this thread
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+def _start_sample() -> Optional[list]:
+    global _sampling
+    if not PROFILE_SLOWEST or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    with _lock:
+        if _sampling:
+            # the event loop thread can only carry one profiler; concurrent
+            # requests interleave with it and show up in its profile too
+            return None
+        _sampling = True
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        _end_sample()
+        return None
+    return [profiler]
+
+def _end_sample() -> None:
+    global _sampling
+    with _lock:
+        _sampling = False
+
+def _dump(profiles: list, path: str) -> None:
+    stats = pstats.Stats(profiles[0])
+    for extra in profiles[1:]:
+        stats.add(extra)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats.dump_stats(path)
+
+async def _keep_if_slow(profiles: list, label: str, seconds: float) -> None:
+    with _lock:
+        if len(_kept) >= PROFILE_SLOWEST and seconds <= _kept[0][0]:
+            return
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+    path = os.path.join(PROFILE_DIR, f"{seconds * 1000:.0f}ms-{slug}-{os.getpid()}-{next(_seq)}.prof")
+    await run_in_threadpool(_dump, profiles, path)
+    with _lock:
+        heapq.heappush(_kept, (seconds, label, path))
+        evicted = heapq.heappop(_kept) if len(_kept) > PROFILE_SLOWEST else None
+    if evicted is not None:
+        try:
+            os.remove(evicted[2])
+        except FileNotFoundError:
+            pass
+
+# ---- middleware ----
+def _server_timing(marks: _Marks) -> str:
+    parts = [f"total;dur={(marks.headers_at - marks.start) * 1000:.1f}"]
+    parts += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in marks.phases().items()]
+    tally = request_tally()
+    if tally is not None:
+        parts[-1] += f';desc="{tally.queries} queries"'
+    return ", ".join(parts)
+
+def _observe(label: str, seconds: float, phases: Dict[str, float]) -> None:
+    ms = seconds * 1000
+    bucket = next((i for i, le in enumerate(BUCKETS_MS) if ms <= le), len(BUCKETS_MS))
+    with _lock:
+        t = _routes.get(label)
+        if t is None:
+            t = _routes[label] = _RouteTimings()
+        t.buckets[bucket] += 1
+        t.requests += 1
+        t.seconds += seconds
+        for name, value in phases.items():
+            t.phases[name] += value
+
+class ProfilingMiddleware:
+    """Server-Timing header, per-route latency histograms and slow-request profiles.
+
+    Must run inside QueryMetricsMiddleware, which owns the per-request SQL tally.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        marks = _Marks(time.perf_counter())
+        token = _marks.set(marks)
+        profiles = _start_sample()
+        sample_token = _sample.set(profiles)
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                marks.headers_at = time.perf_counter()
+                headers = [*message.get("headers", []), (b"server-timing", _server_timing(marks).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            seconds = time.perf_counter() - marks.start
+            if profiles is not None:
+                profiles[0].disable()
+                _end_sample()
+            label = route_label(scope)
+            _observe(label, seconds, marks.phases())
+            _sample.reset(sample_token)
+            _marks.reset(token)
+        if profiles is not None:
+            await _keep_if_slow(profiles, label, seconds)
+
+def profiling_stats() -> dict:
+    with _lock:
+        routes = {}
+        for label, t in sorted(_routes.items()):
+            cumulative = list(itertools.accumulate(t.buckets))
+            routes[label] = {
+                "requests": t.requests,
+                "seconds": round(t.seconds, 6),
+                "buckets_ms": {**{str(le): n for le, n in zip(BUCKETS_MS, cumulative)}, "+Inf": cumulative[-1]},
+                "phase_seconds": {name: round(v, 6) for name, v in t.phases.items()},
+            }
+        profiles = [
+            {"route": label, "ms": round(seconds * 1000, 1), "path": path}
+            for seconds, label, path in sorted(_kept, reverse=True)
+        ]
+    return {"enabled": PROFILING_ENABLED, "routes": routes, "slowest_profiles": profiles}
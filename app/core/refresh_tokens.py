@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import REFRESH_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_PURGE_SECONDS, REFRESH_TOKEN_SYNC_SECONDS
+from app.core.principal import cached_security_version, load_security_version
+from app.core.security import create_access_token, create_refresh_token, identity_claims
+from app.db.session import SessionLocal
+from app.models import RefreshToken, User
+
+# Refresh tokens are single use. Each login starts a family (a device
+# session); every refresh revokes the presented jti and issues the next one in
+# the same family. A jti presented twice means the token was copied, so the
+# whole family is revoked and both holders must log in again.
+#
+# A refresh never reads: the JWT carries the identity claims, the jti is
+# checked against the in-memory revocation index, and rotation is one
+# conditional UPDATE (which also catches reuse that this worker has not heard
+# of yet) plus one INSERT. The index holds explicit revocations (logout,
+# revoked sessions, reuse) until the tokens would have expired anyway; workers
+# pick up each other's every REFRESH_TOKEN_SYNC_SECONDS.
+
+log = logging.getLogger(__name__)
+
+class TokenRevoked(Exception):
+    pass
+
+# ---- revocation index ----
+_lock = threading.Lock()
+_revoked: Dict[str, datetime] = {}  # jti -> expires_at
+_synced_at: Optional[datetime] = None
+
+def is_revoked(jti: str) -> bool:
+    return jti in _revoked
+
+def _remember(rows: Iterable[Tuple[str, datetime]]) -> None:
+    with _lock:
+        _revoked.update(rows)
+
+def revocation_stats() -> dict:
+    return {"revoked": len(_revoked)}
+
+# ---- issue / rotate / revoke ----
+def _issue(db: Session, claims: dict, family: str, device: Optional[str], jti: Optional[str] = None) -> dict:
+    jti = jti or uuid.uuid4().hex
+    now = datetime.utcnow()
+    db.execute(insert(RefreshToken).values(
+        jti=jti,
+        family=family,
+        user_id=claims["uid"],
+        device=device,
+        issued_at=now,
+        expires_at=now + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES),
+    ))
+    return {
+        "access_token": create_access_token(claims),
+        "refresh_token": create_refresh_token({**claims, "jti": jti, "fam": family}),
+        "token_type": "bearer",
+    }
+
+def issue_tokens(db: Session, user: User, device: Optional[str]) -> dict:
+    """Token pair for a new device session of user; caller commits."""
+    return _issue(db, {"sub": user.username, **identity_claims(user)}, uuid.uuid4().hex, device)
+
+def _current_claims(db: Session, payload: dict) -> dict:
+    # the refresh token's own claims, unless a role or group change bumped the security version since
+    hit, version = cached_security_version(payload["uid"])
+    if not hit:
+        version = load_security_version(db, payload["uid"])
+    if version == payload.get("sv"):
+        return {key: payload[key] for key in ("sub", "uid", "role", "gids", "sv")}
+    user = db.get(User, payload["uid"])
+    if user is None:
+        raise TokenRevoked()
+    return {"sub": user.username, **identity_claims(user)}
+
+def rotate(db: Session, payload: dict) -> dict:
+    """Exchange a decoded refresh token for the next token pair of its family.
+
+    Raises TokenRevoked for a revoked, already used or pre-rotation token; a
+    reused one revokes its family first.
+    """
+    jti, family = payload.get("jti"), payload.get("fam")
+    if not jti or not family or "uid" not in payload:
+        raise TokenRevoked()
+    if is_revoked(jti):  # indexed jtis were revoked with their whole family
+        raise TokenRevoked()
+    claims = _current_claims(db, payload)
+    new_jti = uuid.uuid4().hex
+    row = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == jti, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow(), replaced_by=new_jti)
+        .returning(RefreshToken.device)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:  # rotated or revoked already, possibly by another worker
+        db.rollback()
+        revoke_family(db, family)
+        raise TokenRevoked()
+    tokens = _issue(db, claims, family, row.device, new_jti)
+    db.commit()
+    return tokens
+
+def revoke_family(db: Session, family: str, user_id: Optional[int] = None) -> int:
+    """Revoke a device session (restricted to user_id's when given); commits. Returns the live tokens revoked."""
+    stmt = update(RefreshToken).where(RefreshToken.family == family, RefreshToken.revoked_at.is_(None))
+    if user_id is not None:
+        stmt = stmt.where(RefreshToken.user_id == user_id)
+    rows = db.execute(
+        stmt.values(revoked_at=datetime.utcnow())
+        .returning(RefreshToken.jti, RefreshToken.expires_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    _remember(rows)
+    return len(rows)
+
+def device_sessions(db: Session, user_id: int) -> List[RefreshToken]:
+    """The live token of each of user_id's device sessions, most recently refreshed first."""
+    return db.scalars(
+        select(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .order_by(RefreshToken.issued_at.desc())
+    ).all()
+
+# ---- background sync and purge ----
+def sync_revocations(db: Session) -> int:
+    """Load revocations made since the last sync (by any worker) into the index."""
+    global _synced_at
+    now = datetime.utcnow()
+    # overlap the previous window, for transactions that committed late or clocks that disagree
+    since = (_synced_at or now - timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)) - timedelta(seconds=REFRESH_TOKEN_SYNC_SECONDS)
+    rows = db.execute(
+        select(RefreshToken.jti, RefreshToken.expires_at).where(
+            RefreshToken.revoked_at >= since,
+            RefreshToken.replaced_by.is_(None),  # rotated tokens are caught by the conditional UPDATE
+            RefreshToken.expires_at > now,
+        )
+    ).all()
+    db.rollback()
+    _remember(rows)
+    _synced_at = now
+    return len(rows)
+
+def purge_expired(db: Session) -> int:
+    """Delete expired tokens and forget them in the index."""
+    now = datetime.utcnow()
+    removed = db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now)).rowcount
+    db.commit()
+    with _lock:
+        for jti in [jti for jti, expires_at in _revoked.items() if expires_at <= now]:
+            del _revoked[jti]
+    return removed
+
+def _maintain(purge: bool) -> None:
+    db = SessionLocal()
+    try:
+        sync_revocations(db)
+        if purge:
+            removed = purge_expired(db)
+            if removed:
+                log.info("purged %d expired refresh tokens", removed)
+    finally:
+        db.close()
+
+async def maintain_refresh_tokens() -> None:
+    """Sync the revocation index every REFRESH_TOKEN_SYNC_SECONDS, purging every REFRESH_TOKEN_PURGE_SECONDS, until cancelled."""
+    next_purge = time.monotonic() + REFRESH_TOKEN_PURGE_SECONDS
+    while True:
+        purge = REFRESH_TOKEN_PURGE_SECONDS > 0 and time.monotonic() >= next_purge
+        try:
+            await run_in_threadpool(_maintain, purge)
+            if purge:
+                next_purge = time.monotonic() + REFRESH_TOKEN_PURGE_SECONDS
+        except Exception:
+            log.exception("refresh token maintenance failed")
+        await asyncio.sleep(REFRESH_TOKEN_SYNC_SECONDS)
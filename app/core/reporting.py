@@ -0,0 +1,48 @@
+from sqlalchemy import Date, and_, delete, func, select, text, true
+from sqlalchemy.orm import Session
+from app.core.config import REPORT_EXCLUDED_STATUSES
+from app.db.dialect import insert_for
+from app.models import CustomerSpend, DailySales, ItemSales, Order, OrderDetail
+
+# Summary tables are kept current with deltas: an order write removes the
+# order's old contribution (sign=-1) and adds its new one (sign=+1). Each
+# step is an INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE that
+# runs entirely in the database, so no order data is fetched to do it.
+
+def _upsert(db: Session, model, key: str, columns: list, query):
+    stmt = insert_for(db, model).from_select([key, *columns], query)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in columns},
+    )
+
+def apply_orders(db: Session, where, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) the orders matching `where`; caller commits."""
+    counted = and_(where, Order.status.not_in(REPORT_EXCLUDED_STATUSES))
+    day = func.date(Order.created_at, type_=Date)
+    total = func.coalesce(func.sum(Order.total), 0)
+    db.execute(_upsert(db, DailySales, "day", ["orders", "revenue"], (
+        select(day, sign * func.count(), sign * total).where(counted).group_by(day)
+    )))
+    db.execute(_upsert(db, CustomerSpend, "customer_id", ["orders", "spend"], (
+        select(Order.customer_id, sign * func.count(), sign * total).where(counted).group_by(Order.customer_id)
+    )))
+    db.execute(_upsert(db, ItemSales, "item_id", ["quantity", "revenue"], (
+        select(
+            OrderDetail.item_id,
+            sign * func.sum(OrderDetail.quantity),
+            sign * func.sum(OrderDetail.quantity * OrderDetail.unit_price),
+        )
+        .join(Order, Order.id == OrderDetail.order_id)
+        .where(counted)
+        .group_by(OrderDetail.item_id)
+    )))
+
+def rebuild_summaries(db: Session) -> None:
+    """Recompute every summary from scratch; caller commits."""
+    if db.get_bind().dialect.name == "postgresql":
+        # keep order writes (and their deltas) out until the rebuild commits
+        db.execute(text("LOCK TABLE orders, order_details IN SHARE MODE"))
+    for model in (DailySales, CustomerSpend, ItemSales):
+        db.execute(delete(model))
+    apply_orders(db, true())
@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple, Type
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS
+from app.core.serialization import dump_rows
+
+# Serialized GET responses keyed by path + query. Every table has a version
+# counter that is bumped after any session commits a write to it; an entry
+# is served only while the versions of the tables it was built from are
+# unchanged. ETags hash the body, so they are strong and identical across
+# workers. Versions are per process: RESPONSE_CACHE_TTL_SECONDS bounds how
+# long another worker's writes can go unnoticed (0 = trust versions only).
+
+class _Entry(NamedTuple):
+    versions: Tuple[int, ...]
+    expires_at: float
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+_bytes = 0
+_stats = {"hits": 0, "not_modified": 0, "misses": 0, "evictions": 0}
+_CACHE_CONTROL = "private, no-cache"  # clients may keep it but must revalidate
+
+def bump(*tables: str) -> None:
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+# ---- write tracking: tables touched in a transaction are bumped after it commits ----
+def _touched(session: Session) -> set:
+    return session.info.setdefault("response_cache_tables", set())
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            _touched(state.session).add(table.name)
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        _touched(session).add(obj.__table__.name)
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    tables = session.info.pop("response_cache_tables", None)
+    if tables:
+        bump(*tables)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session, previous_transaction):
+    session.info.pop("response_cache_tables", None)
+
+# ---- lookup/store ----
+def _current(tables: Tuple[str, ...]) -> Tuple[int, ...]:
+    return tuple(_versions.get(t, 0) for t in tables)
+
+def _lookup(key: tuple, tables: Tuple[str, ...]) -> Optional[_Entry]:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry.versions != _current(tables) or (RESPONSE_CACHE_TTL_SECONDS and entry.expires_at < time.monotonic()):
+            _drop(key)
+            return None
+        _entries.move_to_end(key)
+        return entry
+
+def _drop(key: tuple) -> None:
+    global _bytes
+    _bytes -= len(_entries.pop(key).body)
+
+def _store(key: tuple, entry: _Entry) -> None:
+    global _bytes
+    if len(entry.body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        if entry.versions != _current(tuple(key[0])):
+            return  # written to while we were building it
+        if key in _entries:
+            _drop(key)
+        _entries[key] = entry
+        _bytes += len(entry.body)
+        while _bytes > RESPONSE_CACHE_MAX_BYTES:
+            _drop(next(iter(_entries)))
+            _stats["evictions"] += 1
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def cached_json(
+    request: Request,
+    tables: Tuple[str, ...],
+    schema: Type[BaseModel],
+    build: Callable[[], Awaitable[Tuple[list, Dict[str, str]]]],
+) -> Response:
+    """Serve a GET from the cache (or 304), else build(), serialize and cache it.
+
+    build returns (rows, extra headers), serialized as a list of schema;
+    tables are every table the rows read.
+    """
+    key = (tables, request.url.path, request.url.query)
+    entry = _lookup(key, tables)
+    cached = entry is not None
+    if not cached:
+        with _lock:
+            versions = _current(tables)  # before reading, so a concurrent write invalidates us
+            _stats["misses"] += 1
+        payload, headers = await build()
+        body = dump_rows(payload, schema)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = _Entry(versions, time.monotonic() + RESPONSE_CACHE_TTL_SECONDS, body, etag, headers)
+        _store(key, entry)
+    headers = {"ETag": entry.etag, "Cache-Control": _CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        if cached:
+            _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    if cached:
+        _stats["hits"] += 1
+    return Response(entry.body, media_type="application/json", headers={**headers, **entry.headers})
+
+def response_cache_stats() -> dict:
+    with _lock:
+        return {"entries": len(_entries), "bytes": _bytes, "max_bytes": RESPONSE_CACHE_MAX_BYTES, **_stats}
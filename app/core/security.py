@@ -1,9 +1,22 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from jose import jwt
 from passlib.context import CryptContext
-from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    JWT_SECRET_KEY,
+    JWT_ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -11,8 +24,82 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
-def create_access_token(data: dict, minutes: int | None = None) -> str:
+def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when `hashed` no longer matches BCRYPT_ROUNDS."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+# ---- bcrypt off the request path ----
+# Hashing is CPU-bound for hundreds of ms, so request handlers hand it to a
+# dedicated process pool instead of holding threadpool slots (and the GIL).
+# At most PASSWORD_HASH_MAX_PENDING jobs may be queued; beyond that callers
+# get PasswordHasherBusy right away rather than waiting behind a login storm.
+
+class PasswordHasherBusy(Exception):
+    pass
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+_pending = 0
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+def _release(future=None) -> None:
+    global _pending
+    with _hash_pool_lock:
+        _pending -= 1
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending
+    with _hash_pool_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHasherBusy()
+        _pending += 1
+    try:
+        future = _get_hash_pool().submit(fn, *args)
+    except BaseException:
+        _release()
+        raise
+    # the slot is freed when the job ends, not when the caller stops waiting:
+    # a cancelled request cannot stop a bcrypt round that is already running
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_and_update_password_async(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update_password, plain, hashed)
+
+def password_hasher_stats() -> dict:
+    return {"pending": _pending, "max_pending": PASSWORD_HASH_MAX_PENDING, "workers": PASSWORD_HASH_WORKERS}
+
+def shutdown_password_hasher() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def identity_claims(user) -> dict:
+    return {
+        "uid": user.id,
+        "role": user.role,
+        "gids": sorted(user.group_ids),
+        "sv": user.security_version,
+    }
+
+def create_access_token(data: dict, minutes: int | None = None, user=None) -> str:
     to_encode = data.copy()
+    if user is not None:
+        to_encode.update(identity_claims(user))
     expire = datetime.utcnow() + timedelta(minutes=minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
@@ -0,0 +1,124 @@
+import json
+import logging
+from decimal import Decimal
+from functools import lru_cache
+from types import UnionType
+from typing import Callable, Dict, Iterable, List, Optional, Type, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from app.core.config import RESPONSE_FAST_JSON
+
+try:  # optional: without orjson the fast path encodes with the stdlib
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+# Fast JSON for ORM-backed responses. The *Out schemas still define the shape
+# (and the OpenAPI docs), but instead of validating every row into a pydantic
+# model and dumping that, each schema is compiled once into a plain function
+# that reads the mapped attributes straight into dicts, which orjson encodes.
+# Rows come from our own tables, so re-validating them buys nothing. Schemas
+# with a field type the compiler does not know keep the pydantic path.
+
+_SCALARS = (int, str, float, bool, EmailStr)
+
+class _Unsupported(Exception):
+    pass
+
+def _decimal(value: Decimal):
+    # every Numeric column here has <= 15 significant digits, which a double
+    # holds exactly: its shortest repr is the same number (and the same bytes
+    # pydantic writes for a float field)
+    if len(value.as_tuple().digits) <= 15 or orjson is None or not hasattr(orjson, "Fragment"):
+        return float(value)
+    return orjson.Fragment(format(value, "f"))
+
+def _float(value):
+    return _decimal(value) if isinstance(value, Decimal) else float(value)
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+# ---- schema -> encoder ----
+def _converter(annotation) -> Optional[Callable]:
+    """None when the attribute can be written as is."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return encoder(annotation)
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (Union, UnionType):  # Optional[X] / X | None
+        converters = [_converter(arg) for arg in args if arg is not type(None)]
+        if len(converters) != 1 or len(args) != 2:
+            raise _Unsupported(annotation)
+        convert = converters[0]
+        return None if convert is None else lambda value: None if value is None else convert(value)
+    if origin in (list, List) and args:
+        item = args[0]
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            encode = encoder(item)
+            return lambda values: [encode(v) for v in values]
+        if item in _SCALARS:
+            return list
+    if origin in (dict, Dict) and args and all(arg in _SCALARS for arg in args):
+        return None
+    if annotation is float:  # Numeric columns load as Decimal; ints become floats as pydantic does
+        return _float
+    if annotation in _SCALARS:
+        return None
+    raise _Unsupported(annotation)
+
+@lru_cache(maxsize=None)
+def encoder(schema: Type[BaseModel]) -> Callable[[object], dict]:
+    """obj -> dict with exactly what schema.model_dump(mode="json") would hold."""
+    fields = []
+    for name, field in schema.model_fields.items():
+        source = field.validation_alias if isinstance(field.validation_alias, str) else name
+        fields.append((name, source, _converter(field.annotation)))
+    fields = tuple(fields)
+
+    def encode(obj) -> dict:
+        # loaded columns sit in the instance dict: reading it skips the ORM descriptors
+        state = obj.__dict__
+        return {
+            name: (state[source] if source in state else getattr(obj, source)) if convert is None
+            else convert(state[source] if source in state else getattr(obj, source))
+            for name, source, convert in fields
+        }
+    return encode
+
+@lru_cache(maxsize=None)
+def _fast(schema: Type[BaseModel]) -> Optional[Callable]:
+    try:
+        return encoder(schema)
+    except _Unsupported:
+        return None
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+# ---- public ----
+def check_fast_json() -> None:
+    """Log once (from the lifespan) when the fast path runs without orjson."""
+    if RESPONSE_FAST_JSON and orjson is None:
+        log.warning("orjson is not installed: list responses fall back to the much slower stdlib json encoder")
+
+def dump_rows(rows: Iterable, schema: Type[BaseModel]) -> bytes:
+    """JSON array of rows shaped by schema (ORM objects or anything with its attributes)."""
+    encode = _fast(schema) if RESPONSE_FAST_JSON else None
+    if encode is None:
+        adapter = _adapter(schema)
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return dumps([encode(row) for row in rows])
+
+def rows_response(rows: Iterable, schema: Type[BaseModel], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Return from a handler declared with response_model=List[schema]: FastAPI then skips its own validation."""
+    return Response(dump_rows(rows, schema), media_type="application/json", headers=headers)
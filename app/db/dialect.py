@@ -0,0 +1,11 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def insert_for(db, model):
+    """INSERT construct with on_conflict_do_* support for the session's backend."""
+    dialect = db.get_bind().dialect.name
+    try:
+        return _INSERTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect}")
@@ -0,0 +1,191 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Pool and query telemetry, collected from engine/pool events and reported by
+# /internal/metrics. Queries are attributed to the route that issued them;
+# anything outside a request (CLI, background workers) is reported as "-".
+
+_lock = threading.Lock()
+
+class _PoolStats:
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+class _Tally:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+class _EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.max_queries = 0
+
+_engines: Dict[str, Engine] = {}
+_pools: Dict[str, _PoolStats] = {}
+_endpoints: Dict[str, _EndpointStats] = {}
+_request: ContextVar[Optional[_Tally]] = ContextVar("db_request_tally", default=None)
+
+class _TimedCheckout:
+    """Times pool.connect(), i.e. the wait for a free slot plus any new connect/ping.
+
+    There is no pool event that fires *before* a checkout, so this is the one
+    piece not collected through events.
+    """
+    _stats: Optional[_PoolStats] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self._stats is not None:
+                with _lock:
+                    self._stats.timeouts += 1
+            raise
+        finally:
+            if self._stats is not None:
+                waited = time.perf_counter() - start
+                with _lock:
+                    self._stats.wait_seconds += waited
+                    self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._stats = self._stats
+        return pool
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def instrument(engine: Engine, name: str) -> None:
+    """Attach pool and query listeners; pass `async_engine.sync_engine` for async engines."""
+    stats = _PoolStats()
+    _engines[name] = engine
+    _pools[name] = stats
+    if isinstance(engine.pool, _TimedCheckout):
+        engine.pool._stats = stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_conn, record):
+        with _lock:
+            stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_conn, record, proxy):
+        with _lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_conn, record):
+        with _lock:
+            stats.checked_out -= 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_conn, record, exception):
+        with _lock:
+            stats.invalidations += 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        tally = _request.get()
+        if tally is not None:
+            tally.queries += 1
+            tally.seconds += elapsed
+        else:
+            _record("-", 1, elapsed, count_request=False)
+
+def _record(label: str, queries: int, seconds: float, count_request: bool = True) -> None:
+    with _lock:
+        s = _endpoints.get(label)
+        if s is None:
+            s = _endpoints[label] = _EndpointStats()
+        s.requests += count_request
+        s.queries += queries
+        s.query_seconds += seconds
+        if count_request:
+            s.max_queries = max(s.max_queries, queries)
+
+class QueryMetricsMiddleware:
+    """Counts the queries each request issues, reported per route template."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        tally = _Tally()
+        token = _request.set(tally)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+            _record(route_label(scope), tally.queries, tally.seconds)
+
+def route_label(scope) -> str:
+    # the router records the matched route in the (shared) scope
+    route = scope.get("route")
+    return f"{scope['method']} {route.path}" if route is not None else "unmatched"
+
+def request_tally() -> Optional[_Tally]:
+    """Statements issued so far by the current request (None outside one)."""
+    return _request.get()
+
+def pool_stats() -> Dict[str, dict]:
+    out = {}
+    with _lock:
+        for name, s in _pools.items():
+            pool = _engines[name].pool
+            out[name] = {
+                "pool": type(pool).__name__,
+                "size": pool.size() if isinstance(pool, QueuePool) else None,
+                "overflow": max(pool.overflow(), 0) if isinstance(pool, QueuePool) else None,
+                "checked_out": s.checked_out,
+                "checkouts": s.checkouts,
+                "connects": s.connects,
+                "invalidations": s.invalidations,
+                "timeouts": s.timeouts,
+                "checkout_wait_seconds": round(s.wait_seconds, 6),
+                "max_checkout_wait_seconds": round(s.max_wait_seconds, 6),
+            }
+    return out
+
+def query_stats() -> Dict[str, dict]:
+    with _lock:
+        return {
+            label: {
+                "requests": s.requests,
+                "queries": s.queries,
+                "query_seconds": round(s.query_seconds, 6),
+                "max_queries_per_request": s.max_queries,
+            }
+            for label, s in sorted(_endpoints.items())
+        }
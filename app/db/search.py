@@ -0,0 +1,42 @@
+from typing import List
+from sqlalchemy import DDL, Index, Select, case, event, func, or_
+from sqlalchemy.orm import Session
+from app.db.session import Base
+
+# Fuzzy lookup for the front desk. On PostgreSQL, pg_trgm GIN indexes serve
+# both substring (ILIKE '%q%') and typo-tolerant word similarity (column %> q)
+# matches, ranked by word_similarity. SQLite (tests, local runs) has no
+# trigram support and falls back to ranked substring matching.
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+def trigram_index(name: str, column: str) -> Index:
+    """GIN trigram index on `column`, created on PostgreSQL only."""
+    return Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+
+def _like_pattern(q: str) -> str:
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search(db: Session, stmt: Select, id_column, columns: list, q: str, limit: int) -> List:
+    """Rows of `stmt` matching q in any of `columns`, best match first."""
+    pattern = _like_pattern(q)
+    substring = [c.ilike(pattern, escape="\\") for c in columns]
+    if db.get_bind().dialect.name == "postgresql":
+        similar = [c.op("%>")(q) for c in columns]
+        score = func.greatest(*(func.word_similarity(q, c) for c in columns))
+        stmt = stmt.where(or_(*substring, *similar)).order_by(score.desc(), id_column)
+    else:
+        lowered = q.lower()
+        score = case(
+            (or_(*(func.lower(c) == lowered for c in columns)), 3),
+            (or_(*(c.ilike(pattern[1:], escape="\\") for c in columns)), 2),  # prefix
+            else_=1,
+        )
+        stmt = stmt.where(or_(*substring)).order_by(score.desc(), id_column)
+    return db.scalars(stmt.limit(limit)).all()
@@ -1,14 +1,118 @@
+import threading
+from typing import Optional, Union
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import DATABASE_URL
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from app.core.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_ASYNC,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+)
+from app.core.profiling import profile_thread
+from app.db.metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+def _pool_options(url: str, poolclass) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return options  # in-memory SQLite needs its single-connection pool
+    return {
+        **options,
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+# Engines are created on first use, not at import: importing the app (workers,
+# CLI tools, test collection) never touches the database, and a database
+# outage fails requests instead of crash-looping workers on boot.
 Base = declarative_base()
+_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_sessions: Optional[sessionmaker] = None
+_async_sessions: Optional[async_sessionmaker] = None
+
+def get_engine() -> Engine:
+    """Sync stack (psycopg2): CLI tools, background workers, and request handlers when DB_ASYNC is off."""
+    global _engine, _sessions
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL, TimedQueuePool))
+                instrument(engine, "sync")
+                _sessions = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+                _engine = engine
+    return _engine
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    """Native asyncio stack (asyncpg); None unless DB_ASYNC is on."""
+    global _async_engine, _async_sessions
+    if DB_ASYNC and _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, TimedAsyncAdaptedQueuePool))
+                instrument(engine.sync_engine, "async")
+                # Nothing may lazy-load once a handler has returned, so objects are not expired on commit.
+                _async_sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+                _async_engine = engine
+    return _async_engine
+
+def SessionLocal() -> Session:
+    get_engine()
+    return _sessions()
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_sessions()
+
+async def dispose_engines() -> None:
+    """Close pooled connections of the engines created so far."""
+    if _async_engine is not None:
+        await _async_engine.dispose()  # aiosqlite connections hold non-daemon threads
+    if _engine is not None:
+        _engine.dispose()
+
+def __getattr__(name: str):
+    # `from app.db.session import engine` keeps working, creating it on access
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class ThreadpoolSession:
+    """A sync Session behind AsyncSession's `await db.run_sync(fn, *args)` interface.
+
+    Handlers are written once against run_sync; DB_ASYNC decides whether that
+    runs on asyncpg in the event loop or on psycopg2 in the threadpool.
+    """
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(profile_thread, fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+DbSession = Union[AsyncSession, ThreadpoolSession]
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_db():
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadpoolSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
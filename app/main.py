@@ -1,32 +1,91 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import engine, Base
-from app.api.v1 import auth, customers, items, permissions
-from app.core.config import API_PREFIX
-
-app = FastAPI(title="FastAPI RBAC Starter")
-
-# Create tables in dev/demo (use Alembic in real projects)
-Base.metadata.create_all(bind=engine)
-
-# CORS (tighten in prod)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from starlette.concurrency import run_in_threadpool
+from app.db.session import dispose_engines
+from app.db.metrics import QueryMetricsMiddleware
+from app.api.v1 import auth, blobs, customers, groups, items, media, orders, permissions, reports, upload_sessions
+from app.api import internal
+from app.api.deps import require_admin
+from app.api.uploads import sweep_upload_sessions
+from app.core.config import (
+    API_PREFIX,
+    DB_CREATE_SCHEMA,
+    PROFILING_ENABLED,
+    REFRESH_TOKEN_SYNC_SECONDS,
+    UPLOAD_SESSION_GC_INTERVAL_SECONDS,
 )
+from app.core.profiling import ProfilingMiddleware, instrument_routes
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.core.derivatives import check_derivatives, shutdown_derivatives
+from app.core.refresh_tokens import maintain_refresh_tokens
+from app.core.security import PasswordHasherBusy, shutdown_password_hasher
+from app.core.serialization import check_fast_json
 
-# Routers
-app.include_router(auth.router, prefix=f"{API_PREFIX}/auth", tags=["auth"])
-app.include_router(customers.router, prefix=f"{API_PREFIX}/customers", tags=["customers"])
-app.include_router(items.router, prefix=f"{API_PREFIX}/items", tags=["items"])
+# Building the app does no I/O; the database is first touched by the lifespan
+# (DB_CREATE_SCHEMA) or the first request.
 
-# ...
-app.include_router(permissions.router, prefix=f"{API_PREFIX}/permissions", tags=["permissions"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_fast_json()
+    check_derivatives()
+    if DB_CREATE_SCHEMA:
+        from app.schema import create_schema
+        await run_in_threadpool(create_schema)  # dev/demo; use `python -m app.schema create` in deploys
+    sweeper = asyncio.create_task(sweep_upload_sessions()) if UPLOAD_SESSION_GC_INTERVAL_SECONDS > 0 else None
+    maintainer = asyncio.create_task(maintain_refresh_tokens()) if REFRESH_TOKEN_SYNC_SECONDS > 0 else None
+    yield
+    for task in (sweeper, maintainer):
+        if task is not None:
+            task.cancel()
+    shutdown_derivatives()
+    shutdown_password_hasher()
+    await dispose_engines()
 
+def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse({"detail": "Too many concurrent logins, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
 
-@app.get("/")
 def root():
     return {"status": "ok", "name": "FastAPI RBAC Starter"}
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="FastAPI RBAC Starter", lifespan=lifespan)
+
+    # CORS (tighten in prod)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "Link"],
+    )
+    if PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)  # inside QueryMetricsMiddleware, whose SQL tally it reports
+    app.add_middleware(QueryMetricsMiddleware)
+
+    # Routers
+    app.include_router(auth.router, prefix=f"{API_PREFIX}/auth", tags=["auth"])
+    app.include_router(customers.router, prefix=f"{API_PREFIX}/customers", tags=["customers"])
+    app.include_router(items.router, prefix=f"{API_PREFIX}/items", tags=["items"])
+    app.include_router(orders.router, prefix=f"{API_PREFIX}/orders", tags=["orders"])
+    app.include_router(reports.router, prefix=f"{API_PREFIX}/reports", tags=["reports"])
+    app.include_router(blobs.router, prefix=f"{API_PREFIX}/blobs", tags=["blobs"])
+    app.include_router(media.router, prefix=f"{API_PREFIX}/media", tags=["media"])
+    app.include_router(upload_sessions.router, prefix=f"{API_PREFIX}/uploads", tags=["uploads"])
+
+    # ...
+    app.include_router(permissions.router, prefix=f"{API_PREFIX}/permissions", tags=["permissions"])
+    app.include_router(groups.router, prefix=f"{API_PREFIX}/groups", tags=["groups"])
+    # pool state, per-endpoint SQL timings and profiles: admins only
+    app.include_router(internal.router, prefix="/internal", tags=["internal"], dependencies=[Depends(require_admin)])
+    app.add_api_route("/", root, methods=["GET"])
+    if PROFILING_ENABLED:
+        instrument_routes(app)
+
+    app.add_exception_handler(PasswordHasherBusy, password_hasher_busy)
+    return app
+
+app = create_app()
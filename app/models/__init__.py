@@ -6,3 +6,8 @@ from .customer import Customer, CustomerImage
 from .item import Item, ItemImage
 from .order import Order
 from .order_detail import OrderDetail
+from .blob import ImageBlob
+from .upload import UploadSession
+from .token import RefreshToken
+from .report import DailySales, ItemSales, CustomerSpend
+from .seed import SeedRange
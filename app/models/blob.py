@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.db.session import Base
+
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)  # relative to UPLOAD_DIR: blobs/ab/cd/<sha256><ext>
+    digest = Column(String(64), index=True, nullable=False)  # sha256 hex of the content
+    size = Column(Integer, nullable=False)
@@ -1,6 +1,8 @@
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
+from app.core.derivatives import derivative_path
+from app.db.search import trigram_index
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -9,6 +11,12 @@ class Customer(Base):
     email = Column(String, unique=True, index=True, nullable=True)
     phone = Column(String, nullable=True)
 
+    __table_args__ = (
+        trigram_index("ix_customers_name_trgm", "name"),
+        trigram_index("ix_customers_email_trgm", "email"),
+        trigram_index("ix_customers_phone_trgm", "phone"),
+    )
+
     images = relationship("CustomerImage", back_populates="customer", cascade="all, delete-orphan")
 
 class CustomerImage(Base):
@@ -16,5 +24,11 @@ class CustomerImage(Base):
     id = Column(Integer, primary_key=True)
     customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"))
     image_url = Column(String, nullable=False)  # file path or external URL
+    derivatives = Column(String, nullable=True)  # CSV of rendered sizes, set by the derivative workers
 
     customer = relationship("Customer", back_populates="images")
+
+    @property
+    def derivative_urls(self) -> dict:
+        sizes = (self.derivatives or "").split(",")
+        return {s: derivative_path(self.image_url, int(s)) for s in sizes if s}
@@ -1,6 +1,8 @@
 from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
+from app.core.derivatives import derivative_path
+from app.db.search import trigram_index
 
 class Item(Base):
     __tablename__ = "items"
@@ -9,6 +11,11 @@ class Item(Base):
     sku = Column(String, unique=True, nullable=True)
     price = Column(Numeric(10, 2), nullable=False, default=0)
 
+    __table_args__ = (
+        trigram_index("ix_items_name_trgm", "name"),
+        trigram_index("ix_items_sku_trgm", "sku"),
+    )
+
     images = relationship("ItemImage", back_populates="item", cascade="all, delete-orphan")
 
 class ItemImage(Base):
@@ -16,5 +23,11 @@ class ItemImage(Base):
     id = Column(Integer, primary_key=True)
     item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"))
     image_url = Column(String, nullable=False)
+    derivatives = Column(String, nullable=True)  # CSV of rendered sizes, set by the derivative workers
 
     item = relationship("Item", back_populates="images")
+
+    @property
+    def derivative_urls(self) -> dict:
+        sizes = (self.derivatives or "").split(",")
+        return {s: derivative_path(self.image_url, int(s)) for s in sizes if s}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric, String
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, Numeric, String, func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -8,6 +8,7 @@ class Order(Base):
     customer_id = Column(Integer, ForeignKey("customers.id"))
     status = Column(String, default="pending")
     total = Column(Numeric(10, 2), default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
     customer = relationship("Customer")
     details = relationship("OrderDetail", back_populates="order", cascade="all, delete-orphan")
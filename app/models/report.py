@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, Integer, ForeignKey, Numeric
+from app.db.session import Base
+
+# Reporting aggregates, maintained incrementally by app.core.reporting as
+# orders are written; rebuild with `python -m app.rebuild_reports`.
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+    day = Column(Date, primary_key=True)  # order creation date (database time zone)
+    orders = Column(Integer, default=0, nullable=False)
+    revenue = Column(Numeric(14, 2), default=0, nullable=False)
+
+class ItemSales(Base):
+    __tablename__ = "item_sales"
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(Numeric(14, 2), default=0, nullable=False, index=True)
+
+class CustomerSpend(Base):
+    __tablename__ = "customer_spend"
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    orders = Column(Integer, default=0, nullable=False)
+    spend = Column(Numeric(14, 2), default=0, nullable=False, index=True)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.db.session import Base
+
+class SeedRange(Base):
+    """Ids written by app.seed for a table whose rows carry no seed marker of their own (orders)."""
+    __tablename__ = "seed_ranges"
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, index=True, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)  # inclusive
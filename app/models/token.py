@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from app.db.session import Base
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    jti = Column(String(32), primary_key=True)
+    family = Column(String(32), index=True, nullable=False)  # one per login: a device session, kept across rotations
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    device = Column(String(200), nullable=True)
+    issued_at = Column(DateTime, nullable=False)  # UTC, like the JWT exp
+    expires_at = Column(DateTime, index=True, nullable=False)
+    revoked_at = Column(DateTime, index=True, nullable=True)  # set on rotation, logout or reuse
+    replaced_by = Column(String(32), nullable=True)  # jti issued when this one was rotated
@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+from app.db.session import Base
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    id = Column(String(32), primary_key=True)  # random hex; also names the partial file
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    target = Column(String(16), nullable=False)  # customer | item
+    target_id = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    received = Column(String, default="", server_default="", nullable=False)  # merged "start-end" byte ranges on disk, end exclusive
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True, nullable=False)  # UTC
@@ -7,7 +7,7 @@ class UserGroup(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), index=True)
-    UniqueConstraint("user_id", "group_id", name="uq_user_group")
+    __table_args__ = (UniqueConstraint("user_id", "group_id", name="uq_user_group"),)
 
 class User(Base):
     __tablename__ = "users"
@@ -16,6 +16,10 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=True)
     password = Column(String, nullable=False)
     role = Column(String, default="user", nullable=False)  # user | admin | superadmin
-    refresh_token = Column(String, nullable=True)
+    security_version = Column(Integer, default=0, server_default="0", nullable=False)  # bumped on role/group change
 
     groups = relationship("Group", secondary="user_groups", back_populates="users", lazy="joined")
+
+    @property
+    def group_ids(self) -> frozenset:
+        return frozenset(g.id for g in self.groups)
@@ -0,0 +1,20 @@
+"""Recompute the reporting summary tables from orders (backfills, repairs).
+
+    python -m app.rebuild_reports
+"""
+import argparse
+import time
+from app.core.reporting import rebuild_summaries
+from app.db.session import SessionLocal
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        rebuild_summaries(db)
+        db.commit()
+    print(f"Rebuilt daily_sales, item_sales and customer_spend in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Create (or drop) the database tables; run before starting workers.
+
+    python -m app.schema create
+    python -m app.schema drop --yes
+
+There are no migrations: `create` adds missing tables, then upgrades the
+ones that already existed. Columns the models gained are added, with
+existing rows getting the column's server default (orders.created_at: the
+time of the upgrade). Missing indexes are created, and reporting tables
+created next to existing orders are filled with a rebuild.
+"""
+import argparse
+import sys
+import time
+from sqlalchemy import Table, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+import app.models  # noqa: F401  registers every table on Base.metadata
+from app.core.reporting import rebuild_summaries
+from app.db.session import Base, SessionLocal, get_engine
+
+# maintained from orders as they are written, so they start from a rebuild
+_SUMMARY_TABLES = {"daily_sales", "item_sales", "customer_spend"}
+
+def create_schema() -> None:
+    engine = get_engine()
+    existing = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    if existing:
+        with engine.begin() as conn:
+            upgrade_schema(conn, existing)
+    if "orders" in existing and _SUMMARY_TABLES - existing:
+        with SessionLocal() as db:
+            rebuild_summaries(db)
+            db.commit()
+
+def upgrade_schema(conn: Connection, existing: set) -> None:
+    """Bring tables created by an older version up to the models (existing = table names before create_all)."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        present = {c["name"] for c in inspector.get_columns(table.name)}
+        if any(c.name not in present for c in table.columns):
+            if conn.dialect.name == "sqlite":
+                _rebuild_sqlite_table(conn, table, present)  # also creates its indexes
+                continue
+            for column in table.columns:
+                if column.name not in present:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} "
+                        f"ADD COLUMN IF NOT EXISTS {CreateColumn(column).compile(dialect=conn.dialect)}"
+                    )
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)  # skipped where its ddl_if says so (trigram indexes off PostgreSQL)
+
+def _rebuild_sqlite_table(conn: Connection, table: Table, present: set) -> None:
+    # SQLite cannot add a column whose default is not a constant (CURRENT_TIMESTAMP),
+    # so the table is created again from the model and the rows are copied over
+    name = conn.dialect.identifier_preparer.format_table(table)
+    old = conn.dialect.identifier_preparer.quote(f"_old_{table.name}")
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")  # keep other tables' foreign keys on the name
+    conn.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {old}")
+    for index in inspect(conn).get_indexes(f"_old_{table.name}"):  # renamed along, names still taken
+        conn.exec_driver_sql(f"DROP INDEX {conn.dialect.identifier_preparer.quote(index['name'])}")
+    table.create(conn)
+    columns = ", ".join(conn.dialect.identifier_preparer.quote(c.name) for c in table.columns if c.name in present)
+    conn.exec_driver_sql(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+
+def drop_schema() -> None:
+    Base.metadata.drop_all(bind=get_engine())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["create", "drop"])
+    parser.add_argument("--yes", action="store_true", help="confirm drop")
+    args = parser.parse_args(argv)
+    if args.command == "drop" and not args.yes:
+        sys.exit("Refusing to drop every table without --yes")
+    started = time.perf_counter()
+    (create_schema if args.command == "create" else drop_schema)()
+    print(f"Schema {args.command}d in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+class ImageBlobOut(BaseModel):
+    digest: str
+    image_url: str
+    size: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "digest": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "image_url": "blobs/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.jpg",
+                "size": 48213
+            }
+        }
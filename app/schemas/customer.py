@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr
+from typing import Dict, List, Optional
 
 class CustomerImageCreate(BaseModel):
     image_url: str
@@ -14,6 +14,8 @@ class CustomerImageCreate(BaseModel):
 class CustomerImageOut(BaseModel):
     id: int
     image_url: str
+    # rendition size (px) -> relative URL; filled in once the background workers finish
+    derivatives: Dict[str, str] = Field(default_factory=dict, validation_alias="derivative_urls")
     
     class Config:
         from_attributes = True
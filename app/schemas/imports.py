@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+class ImportResult(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "inserted": 9998,
+                "failed": 2,
+                "errors": [
+                    {"line": 14, "errors": ["email: value is not a valid email address"]},
+                    {"line": 873, "errors": ["Email already exists"]}
+                ],
+                "errors_truncated": False
+            }
+        }
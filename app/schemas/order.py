@@ -0,0 +1,78 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class OrderLineIn(BaseModel):
+    item_id: int
+    quantity: int = Field(1, ge=1)
+
+class OrderCreate(BaseModel):
+    customer_id: int
+    status: str = "pending"
+    details: List[OrderLineIn] = Field(..., min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "customer_id": 1,
+                "details": [
+                    {"item_id": 3, "quantity": 2},
+                    {"item_id": 7, "quantity": 1}
+                ]
+            }
+        }
+
+class OrderUpdate(BaseModel):
+    status: Optional[str] = None
+    details: Optional[List[OrderLineIn]] = Field(None, min_length=1)  # replaces all lines, repriced
+
+class OrderItemOut(BaseModel):
+    id: int
+    name: str
+    sku: str | None = None
+
+    class Config:
+        from_attributes = True
+
+class OrderDetailOut(BaseModel):
+    id: int
+    item_id: int
+    quantity: int
+    unit_price: float
+    item: OrderItemOut
+
+    class Config:
+        from_attributes = True
+
+class OrderOut(BaseModel):
+    id: int
+    customer_id: int
+    status: str
+    total: float
+    details: List[OrderDetailOut] = []
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 1,
+                "customer_id": 1,
+                "status": "pending",
+                "total": 179.97,
+                "details": [
+                    {
+                        "id": 1,
+                        "item_id": 3,
+                        "quantity": 2,
+                        "unit_price": 59.99,
+                        "item": {"id": 3, "name": "Gaming Mouse", "sku": "GM001"}
+                    },
+                    {
+                        "id": 2,
+                        "item_id": 7,
+                        "quantity": 1,
+                        "unit_price": 59.99,
+                        "item": {"id": 7, "name": "Mouse Pad", "sku": "MP010"}
+                    }
+                ]
+            }
+        }
@@ -0,0 +1,29 @@
+from datetime import date
+from pydantic import BaseModel
+
+class DailySalesOut(BaseModel):
+    day: date
+    orders: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {"example": {"day": "2024-05-01", "orders": 42, "revenue": 5230.5}}
+
+class ItemSalesOut(BaseModel):
+    item_id: int
+    quantity: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {"example": {"item_id": 3, "quantity": 118, "revenue": 7078.82}}
+
+class CustomerSpendOut(BaseModel):
+    customer_id: int
+    orders: int
+    spend: float
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {"example": {"customer_id": 1, "orders": 12, "spend": 1840.0}}
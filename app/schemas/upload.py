@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+class UploadSessionCreate(BaseModel):
+    target: Literal["customer", "item"]
+    target_id: int
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=1)  # total bytes the client will send
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "target": "customer",
+                "target_id": 1,
+                "filename": "walkaround.mp4",
+                "size": 734003200
+            }
+        }
+
+class UploadSessionOut(BaseModel):
+    id: str
+    target: str
+    target_id: int
+    filename: str
+    size: int
+    received: List[List[int]]  # [start, end) byte ranges already stored, merged and sorted
+    complete: bool
+    expires_at: datetime  # UTC; extended by every chunk
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "3f0c5e1d9b7a4c2e8f6d1a0b9c8e7f6a",
+                "target": "customer",
+                "target_id": 1,
+                "filename": "walkaround.mp4",
+                "size": 734003200,
+                "received": [[0, 8388608], [16777216, 25165824]],
+                "complete": False,
+                "expires_at": "2024-05-02T09:30:00"
+            }
+        }
+
+class UploadCompleteOut(BaseModel):
+    target: str
+    target_id: int
+    image_id: int
+    image_url: str
+    digest: str
+    size: int
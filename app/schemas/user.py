@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from datetime import datetime
 from typing import List, Optional
 
 class UserCreate(BaseModel):
@@ -35,3 +36,26 @@ class UserOut(BaseModel):
                 "groups": ["admin", "manager"]
             }
         }
+
+class GroupAssignIn(BaseModel):
+    usernames: List[str]
+    groups: List[str]  # names; missing groups are created
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "usernames": ["johndoe", "janedoe"],
+                "groups": ["staff", "mechanic"]
+            }
+        }
+
+class GroupAssignOut(BaseModel):
+    created_groups: List[str]
+    links_added: int
+    users_updated: List[str]  # usernames that gained at least one group
+
+class DeviceSessionOut(BaseModel):
+    id: str  # the token family: DELETE /auth/sessions/{id} signs the device out
+    device: Optional[str] = None
+    last_used_at: datetime  # login or latest refresh
+    expires_at: datetime
@@ -1,50 +1,289 @@
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal, engine, Base
-from app.models import Group, User, UserGroup, Permission
-from app.core.security import hash_password
+"""Seed groups, permissions and default users, plus synthetic data at --scale.
 
-Base.metadata.create_all(bind=engine)
-db: Session = SessionLocal()
+    python -m app.seed                 # groups, permissions, default users
+    python -m app.seed --scale 100     # + 1M customers, 2M orders, ~6M order lines
 
-# Groups
-group_names = ["staff", "officer", "admin", "superadmin"]
-for name in group_names:
-    if not db.query(Group).filter(Group.name == name).first():
-        db.add(Group(name=name))
-db.commit()
+Rows are generated deterministically from their index and --seed. Each table
+is topped up from the number of seeded rows it already has (recognised by
+their names, or for orders by the id ranges kept in seed_ranges), so
+re-running is a no-op and a larger --scale only adds the difference. Rows are written in batches with
+COPY on PostgreSQL (psycopg2) and multi-row INSERTs elsewhere, with ids
+assigned here so foreign keys need no round trip; sequences are moved past
+them afterwards. Seeded users share one precomputed password hash. Run it
+while the app is not writing to the database.
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Sequence
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+from app.core.config import PASSWORD_HASH_WORKERS
+from app.core.groups import link_groups, resolve_groups
+from app.core.reporting import rebuild_summaries
+from app.core.security import hash_password
+from app.db.dialect import insert_for
+from app.db.session import SessionLocal
+from app.models import Customer, CustomerImage, Item, ItemImage, Order, OrderDetail, Permission, SeedRange, User, UserGroup
+from app.schema import create_schema
 
-# Users
-seed_users = [
+GROUPS = ["staff", "officer", "admin", "superadmin"]
+DEFAULT_USERS = [
     ("staff1", "staff123", "user", ["staff"]),
     ("officer1", "officer123", "user", ["officer"]),
     ("admin1", "admin123", "admin", ["admin"]),
     ("super1", "super123", "superadmin", ["superadmin"]),
 ]
-for username, password, role, groups in seed_users:
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        user = User(username=username, password=hash_password(password), role=role)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    # attach groups
-    for gname in groups:
-        g = db.query(Group).filter(Group.name == gname).first()
-        if g and g not in user.groups:
-            user.groups.append(g)
-    db.commit()
-
-# Permissions (CSV allowed_groups)
-permissions = [
+# (module, endpoint, CSV allowed_groups)
+PERMISSIONS = [
     ("customer", "create-customer", "staff,admin,officer"),
     ("customer", "customer-upload-images", "staff,admin"),
+    ("customer", "import-customers", "admin"),
     ("item", "create-item", "admin,officer"),
     ("item", "item-upload-images", "admin,officer"),
+    ("item", "import-items", "admin"),
+    ("order", "create-order", "staff,admin,officer"),
+    ("order", "update-order", "staff,admin"),
+    ("report", "view-reports", "admin,officer"),
 ]
-for module, endpoint, csv_groups in permissions:
-    if not db.query(Permission).filter(Permission.endpoint_name == endpoint).first():
-        db.add(Permission(module=module, endpoint_name=endpoint, allowed_groups=csv_groups))
-db.commit()
 
-print("Seeding complete.")
-db.close()
+SEED_USERNAME = "seed-user-{}"
+SEED_PASSWORD = "seed-password"
+_CUSTOMER_EMAIL = "seed.customer{}@example.com"
+_SKU = "SEED-{:08d}"
+_STATUSES = ["pending", "pending", "done", "done", "done", "cancelled"]
+_FIRST = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Jamie", "Robin", "Avery", "Quinn"]
+_LAST = ["Smith", "Garcia", "Nguyen", "Okafor", "Rossi", "Kowalski", "Haddad", "Tanaka", "Silva", "Brown"]
+_PARTS = ["Brake pad", "Oil filter", "Spark plug", "Wiper blade", "Air filter", "Timing belt", "Battery", "Headlight"]
+
+def sizes(scale: float) -> Dict[str, int]:
+    def n(base):
+        return int(base * scale)
+    return {
+        "users": n(100),
+        "customers": n(10_000),
+        "items": n(1_000),
+        "customer_images": n(5_000),
+        "item_images": n(1_000),
+        "orders": n(20_000),
+    }
+
+class _Writer:
+    """Batched bulk writes: COPY when the driver supports it, else executemany INSERTs."""
+    def __init__(self, db: Session):
+        self.db = db
+        self.postgres = db.get_bind().dialect.name == "postgresql"
+
+    def write(self, model, columns: Sequence[str], rows: List[tuple]) -> None:
+        if not rows:
+            return
+        table = model.__table__
+        cursor = self.db.connection().connection.cursor() if self.postgres else None
+        if cursor is not None and hasattr(cursor, "copy_expert"):
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows)  # None -> empty field -> NULL
+            buf.seek(0)
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+            cursor.close()
+        else:
+            self.db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+    def next_id(self, model) -> int:
+        return (self.db.scalar(select(func.max(model.id))) or 0) + 1
+
+    def sync_sequence(self, model) -> None:
+        """Move the id sequence past explicitly assigned ids (PostgreSQL only)."""
+        if self.postgres:
+            table = model.__tablename__
+            self.db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce((SELECT max(id) FROM {table}), 1))"
+            ))
+
+class _Seeder:
+    def __init__(self, db: Session, scale: float, seed: int, batch_size: int, log: Callable[[str], None]):
+        self.db = db
+        self.writer = _Writer(db)
+        self.sizes = sizes(scale)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.added: Dict[str, int] = {}
+
+    def r(self, *parts: int) -> int:
+        # deterministic across runs and processes (int tuples are not hash-randomized)
+        return hash((self.seed, *parts)) & 0x7FFFFFFF
+
+    def _existing(self, stmt) -> int:
+        return self.db.scalar(stmt) or 0
+
+    def _fill(self, name: str, model, columns: Sequence[str], existing: int, make_row: Callable[[int, int], tuple]) -> None:
+        """Insert rows existing..target of one table with ids assigned here; one commit at the end."""
+        target = self.sizes[name]
+        if existing >= target:
+            return
+        started = time.perf_counter()
+        next_id = self.writer.next_id(model)
+        for start in range(existing, target, self.batch_size):
+            indexes = range(start, min(start + self.batch_size, target))
+            self.writer.write(model, columns, [make_row(next_id + i - existing, i) for i in indexes])
+        self.writer.sync_sequence(model)
+        self.db.commit()
+        self.added[name] = target - existing
+        self.log(f"{name}: +{target - existing} in {time.perf_counter() - started:.1f}s")
+
+    def _ids(self, stmt) -> List:
+        return list(self.db.execute(stmt).all())
+
+    # ---- sections ----
+    def base(self) -> None:
+        group_ids, created = resolve_groups(self.db, GROUPS)
+        self.db.execute(
+            insert_for(self.db, Permission).on_conflict_do_nothing(index_elements=[Permission.endpoint_name]),
+            [{"module": m, "endpoint_name": e, "allowed_groups": g} for m, e, g in PERMISSIONS],
+        )
+        taken = set(self.db.scalars(select(User.username).where(User.username.in_([u[0] for u in DEFAULT_USERS]))))
+        missing = [u for u in DEFAULT_USERS if u[0] not in taken]
+        if missing:
+            # bcrypt is deliberately slow; hash the few real passwords side by side
+            with ProcessPoolExecutor(min(len(missing), PASSWORD_HASH_WORKERS), mp_context=multiprocessing.get_context("spawn")) as pool:
+                hashes = list(pool.map(hash_password, [u[1] for u in missing]))
+            ids = self.db.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [{"username": u[0], "password": h, "role": u[2]} for u, h in zip(missing, hashes)],
+            ).all()
+            for user_id, (_, _, _, groups) in zip(ids, missing):
+                link_groups(self.db, [user_id], [group_ids[g] for g in groups], new_users=True)
+        self.db.commit()
+        self.group_ids = group_ids
+        self.added["default_users"] = len(missing)
+        self.added["groups"] = len(created)
+
+    def users(self) -> None:
+        target = self.sizes["users"]
+        existing = self._existing(select(func.count()).where(User.username.like("seed-user-%")))
+        if existing >= target:
+            return
+        hashed = hash_password(SEED_PASSWORD)  # once: bcrypt per synthetic user would take hours at scale
+        user_id = self.writer.next_id(User)
+        for start in range(existing, target, self.batch_size):
+            indexes = range(start, min(start + self.batch_size, target))
+            users = [(user_id + n, SEED_USERNAME.format(i), hashed, "user") for n, i in enumerate(indexes)]
+            # every 10th seeded user is an officer, the rest are staff
+            links = [(u[0], self.group_ids["officer" if i % 10 == 0 else "staff"]) for u, i in zip(users, indexes)]
+            self.writer.write(User, ["id", "username", "password", "role"], users)
+            self.writer.write(UserGroup, ["user_id", "group_id"], links)
+            user_id += len(users)
+        self.writer.sync_sequence(User)
+        self.db.commit()
+        self.added["users"] = target - existing
+        self.log(f"users: +{target - existing}")
+
+    def customers(self) -> None:
+        existing = self._existing(select(func.count()).where(Customer.email.like("seed.customer%@example.com")))
+
+        def row(id_, i):
+            name = f"{_FIRST[self.r(1, i) % len(_FIRST)]} {_LAST[self.r(2, i) % len(_LAST)]} {i}"
+            return (id_, name, _CUSTOMER_EMAIL.format(i), f"+1555{i:07d}")
+        self._fill("customers", Customer, ["id", "name", "email", "phone"], existing, row)
+
+    def items(self) -> None:
+        existing = self._existing(select(func.count()).where(Item.sku.like("SEED-%")))
+
+        def row(id_, i):
+            return (id_, f"{_PARTS[self.r(3, i) % len(_PARTS)]} {i}", _SKU.format(i), self._price(i))
+        self._fill("items", Item, ["id", "name", "sku", "price"], existing, row)
+
+    def _price(self, i: int) -> Decimal:
+        return Decimal(100 + self.r(4, i) % 50_000) / 100
+
+    def _seeded_customers(self) -> List[int]:
+        return self.db.scalars(
+            select(Customer.id).where(Customer.email.like("seed.customer%@example.com")).order_by(Customer.id)
+        ).all()
+
+    def _seeded_items(self) -> List[tuple]:
+        return self._ids(select(Item.id, Item.price).where(Item.sku.like("SEED-%")).order_by(Item.id))
+
+    def images(self) -> None:
+        customers = self._seeded_customers()
+        if customers:
+            existing = self._existing(select(func.count()).where(CustomerImage.image_url.like("seed/customers/%")))
+            self._fill("customer_images", CustomerImage, ["id", "customer_id", "image_url"], existing,
+                       lambda id_, i: (id_, customers[self.r(5, i) % len(customers)], f"seed/customers/{i}.jpg"))
+        items = self._seeded_items()
+        if items:
+            existing = self._existing(select(func.count()).where(ItemImage.image_url.like("seed/items/%")))
+            self._fill("item_images", ItemImage, ["id", "item_id", "image_url"], existing,
+                       lambda id_, i: (id_, items[self.r(6, i) % len(items)][0], f"seed/items/{i}.jpg"))
+
+    def orders(self) -> None:
+        customers = self._seeded_customers()
+        items = self._seeded_items()
+        target = self.sizes["orders"]
+        # orders have no seed marker, and the app adds its own for seeded customers:
+        # count only the id ranges earlier runs recorded
+        existing = self._existing(
+            select(func.count()).select_from(Order)
+            .join(SeedRange, Order.id.between(SeedRange.first_id, SeedRange.last_id))
+            .where(SeedRange.table_name == Order.__tablename__)
+        )
+        if not customers or not items or existing >= target:
+            return
+        started = time.perf_counter()
+        first_id = order_id = self.writer.next_id(Order)
+        lines_added = 0
+        for start in range(existing, target, self.batch_size):
+            orders, details = [], []
+            for i in range(start, min(start + self.batch_size, target)):
+                total = Decimal(0)
+                for j in range(1 + self.r(7, i) % 5):
+                    item_id, price = items[self.r(8, i, j) % len(items)]
+                    quantity = 1 + self.r(9, i, j) % 4
+                    total += price * quantity
+                    details.append((order_id, item_id, quantity, price))
+                created_at = self.now - timedelta(minutes=self.r(10, i) % (365 * 24 * 60))
+                orders.append((order_id, customers[self.r(11, i) % len(customers)], _STATUSES[self.r(12, i) % len(_STATUSES)], total, created_at))
+                order_id += 1
+            self.writer.write(Order, ["id", "customer_id", "status", "total", "created_at"], orders)
+            self.writer.write(OrderDetail, ["order_id", "item_id", "quantity", "unit_price"], details)
+            lines_added += len(details)
+        self.writer.sync_sequence(Order)
+        self.db.add(SeedRange(table_name=Order.__tablename__, first_id=first_id, last_id=order_id - 1))
+        rebuild_summaries(self.db)
+        self.db.commit()
+        self.added["orders"] = target - existing
+        self.added["order_lines"] = lines_added
+        self.log(f"orders: +{target - existing} ({lines_added} lines) and summaries in {time.perf_counter() - started:.1f}s")
+
+def seed(db: Session, scale: float = 0, seed: int = 0, batch_size: int = 10_000, log: Callable[[str], None] = print) -> Dict[str, int]:
+    """Seed up to `scale`; returns the rows added per table."""
+    seeder = _Seeder(db, scale, seed, batch_size, log)
+    seeder.base()
+    seeder.users()
+    seeder.customers()
+    seeder.items()
+    seeder.images()
+    seeder.orders()
+    return seeder.added
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0, help="1 = 10k customers, 20k orders; 0 = base data only")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    create_schema()
+    with SessionLocal() as db:
+        added = seed(db, args.scale, args.seed, args.batch_size)
+    print(f"Seeding complete in {time.perf_counter() - started:.1f}s: {added}")
+
+if __name__ == "__main__":
+    main()
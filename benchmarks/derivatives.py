@@ -0,0 +1,69 @@
+"""Throughput of the thumbnail process pool.
+
+    python -m benchmarks.derivatives --images 200 --workers 1,2,4
+
+Renders synthetic photos through app.core.derivatives.render at each pool
+size and prints one JSON object per run (images/s, wall time).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from PIL import Image
+from app.core.config import DERIVATIVE_FORMAT, DERIVATIVE_SIZES
+from app.core.derivatives import render
+
+def make_images(directory: str, count: int, size=(3024, 4032)) -> list:
+    paths = []
+    rnd = random.Random(0)
+    for i in range(count):
+        path = os.path.join(directory, f"src_{i}.jpg")
+        # noisy, non-uniform content so the encoder does real work
+        im = Image.effect_noise(size, 64).convert("RGB")
+        im.paste((rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)), (0, 0, size[0] // 2, size[1] // 3))
+        im.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def run(sources: list, workers: int, out_dir: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # warm the workers so process start-up is not part of the measurement
+        wait([pool.submit(os.getpid) for _ in range(workers)])
+        started = time.perf_counter()
+        futures = []
+        for i, src in enumerate(sources):
+            targets = [(s, os.path.join(out_dir, f"w{workers}", f"{i}_{s}.{DERIVATIVE_FORMAT}")) for s in DERIVATIVE_SIZES]
+            futures.append(pool.submit(render, src, targets))
+        wait(futures)
+        elapsed = time.perf_counter() - started
+    for f in futures:
+        f.result()
+    return {
+        "benchmark": "derivatives",
+        "workers": workers,
+        "images": len(sources),
+        "sizes": DERIVATIVE_SIZES,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(sources) / elapsed, 2),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = make_images(tmp, args.images)
+        for workers in (int(w) for w in args.workers.split(",")):
+            print(json.dumps(run(sources, workers, tmp)))
+            sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
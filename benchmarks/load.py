@@ -0,0 +1,282 @@
+"""Mixed-workload load test against a synthetic dataset.
+
+    python -m benchmarks.load --scale 0.1 --requests 2000 --concurrency 20 --output load.json
+
+Runs the app in-process (httpx ASGI transport, no network) against a
+throwaway SQLite file, after seeding it with app.seed at --scale. The run
+writes customers, orders and uploads, so it never follows DATABASE_URL;
+set BENCH_DATABASE_URL to benchmark a database of your own (uploads still
+go to the temp directory). A fixed scenario mix (login bursts, paginated lists,
+search, order reads, creates, uploads and permission-guarded writes) is
+drawn from --seed, so the same arguments replay the same requests.
+Prints one JSON object: overall throughput plus per-scenario request counts,
+errors and p50/p95/p99 latency in ms, tagged with the git commit so results
+can be compared between commits. Thumbnail rendering is off unless
+DERIVATIVES_ENABLED is set.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from benchmarks.login_storm import percentiles
+
+# scenario -> weight in the mix
+MIX = {
+    "login_burst": 1,
+    "list_customers": 20,
+    "list_items": 10,
+    "list_orders": 10,
+    "search_customers": 10,
+    "get_order": 15,
+    "top_items": 4,
+    "create_customer": 10,
+    "create_order": 10,
+    "upload_image": 4,
+    "forbidden_write": 6,
+}
+
+class Context:
+    def __init__(self, client, staff: list, admin: dict, counts: dict, ids: dict, login_burst: int):
+        self.client = client
+        self.staff = staff  # auth headers of a few synthetic users
+        self.admin = admin
+        self.counts = counts
+        self.ids = ids  # table -> (min id, max id) when the run started
+        self.login_burst = login_burst
+        self.jpeg = _jpeg()
+        self.samples = {name: [] for name in MIX}
+        self.errors = {name: 0 for name in MIX}
+        self.statuses = {}
+
+    def pick(self, rnd: random.Random, table: str) -> int:
+        return rnd.randint(*self.ids[table])
+
+    async def call(self, scenario: str, expect: int, method: str, url: str, **kwargs):
+        t = time.perf_counter()
+        r = await self.client.request(method, url, **kwargs)
+        self.samples[scenario].append(time.perf_counter() - t)
+        self.statuses[r.status_code] = self.statuses.get(r.status_code, 0) + 1
+        if r.status_code != expect:
+            self.errors[scenario] += 1
+        return r
+
+def _jpeg() -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.effect_noise((640, 480), 64).convert("RGB").save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+# ---- scenarios: (ctx, rnd) -> None ----
+async def login_burst(ctx: Context, rnd: random.Random):
+    from app.seed import SEED_PASSWORD, SEED_USERNAME
+
+    async def one():
+        creds = {"username": SEED_USERNAME.format(rnd.randrange(ctx.counts["users"])), "password": SEED_PASSWORD}
+        await ctx.call("login_burst", 200, "POST", "/api/v1/auth/login", data=creds)
+    await asyncio.gather(*(one() for _ in range(ctx.login_burst)))
+
+async def _paginate(ctx: Context, rnd: random.Random, scenario: str, url: str):
+    headers = rnd.choice(ctx.staff)
+    r = await ctx.call(scenario, 200, "GET", url, headers=headers)
+    for _ in range(rnd.randint(0, 3)):  # follow the cursor for a few more pages
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        r = await ctx.call(scenario, 200, "GET", f"{url}&after={cursor}", headers=headers)
+
+async def list_customers(ctx, rnd):
+    await _paginate(ctx, rnd, "list_customers", "/api/v1/customers/?limit=50")
+
+async def list_items(ctx, rnd):
+    await _paginate(ctx, rnd, "list_items", "/api/v1/items/?limit=50")
+
+async def list_orders(ctx, rnd):
+    customer = ctx.pick(rnd, "customers")
+    await _paginate(ctx, rnd, "list_orders", f"/api/v1/orders/?limit=20&customer_id={customer}")
+
+async def search_customers(ctx, rnd):
+    q = str(rnd.randrange(10, max(11, ctx.counts["customers"])))  # seeded names end in their index
+    await ctx.call("search_customers", 200, "GET", "/api/v1/customers/search", params={"q": q}, headers=rnd.choice(ctx.staff))
+
+async def get_order(ctx, rnd):
+    order_id = ctx.pick(rnd, "orders")
+    await ctx.call("get_order", 200, "GET", f"/api/v1/orders/{order_id}", headers=rnd.choice(ctx.staff))
+
+async def top_items(ctx, rnd):
+    await ctx.call("top_items", 200, "GET", "/api/v1/reports/top-items", headers=ctx.admin)
+
+async def create_customer(ctx, rnd):
+    body = {"name": f"Walk-in {rnd.getrandbits(32):08x}", "phone": f"+1666{rnd.randrange(10**7):07d}"}
+    await ctx.call("create_customer", 200, "POST", "/api/v1/customers/", json=body, headers=rnd.choice(ctx.staff))
+
+async def create_order(ctx, rnd):
+    body = {
+        "customer_id": ctx.pick(rnd, "customers"),
+        "details": [
+            {"item_id": ctx.pick(rnd, "items"), "quantity": rnd.randint(1, 3)}
+            for _ in range(rnd.randint(1, 5))
+        ],
+    }
+    await ctx.call("create_order", 200, "POST", "/api/v1/orders/", json=body, headers=rnd.choice(ctx.staff))
+
+async def upload_image(ctx, rnd):
+    customer_id = ctx.pick(rnd, "customers")
+    # a fresh byte at the end so the blob store has to write it
+    files = [("files", ("photo.jpg", ctx.jpeg + rnd.randbytes(8), "image/jpeg"))]
+    await ctx.call("upload_image", 200, "POST", f"/api/v1/customers/{customer_id}/images/upload", files=files, headers=rnd.choice(ctx.staff))
+
+async def forbidden_write(ctx, rnd):
+    # staff may not create items: the permission check must reject it cheaply
+    await ctx.call("forbidden_write", 403, "POST", "/api/v1/items/", json={"name": "nope"}, headers=rnd.choice(ctx.staff))
+
+SCENARIOS = {
+    "login_burst": login_burst,
+    "list_customers": list_customers,
+    "list_items": list_items,
+    "list_orders": list_orders,
+    "search_customers": search_customers,
+    "get_order": get_order,
+    "top_items": top_items,
+    "create_customer": create_customer,
+    "create_order": create_order,
+    "upload_image": upload_image,
+    "forbidden_write": forbidden_write,
+}
+
+def plan(count: int, seed: int) -> list:
+    rnd = random.Random(seed)
+    return rnd.choices(list(MIX), weights=list(MIX.values()), k=count)
+
+async def execute(ctx: Context, scenarios: list, concurrency: int, seed: int) -> float:
+    queue = list(reversed(scenarios))
+
+    async def worker(n: int):
+        rnd = random.Random(seed * 1000 + n)
+        while queue:
+            await SCENARIOS[queue.pop()](ctx, rnd)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return time.perf_counter() - started
+
+def id_ranges(db) -> dict:
+    from sqlalchemy import func, select
+    from app.models import Customer, Item, Order
+
+    return {
+        model.__tablename__: tuple(db.execute(select(func.min(model.id), func.max(model.id))).one())
+        for model in (Customer, Item, Order)
+    }
+
+async def run(app, counts: dict, ids: dict, args) -> dict:
+    import httpx
+    from app.seed import DEFAULT_USERS, SEED_PASSWORD, SEED_USERNAME
+    from app.db.session import dispose_engines
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def token(username: str, password: str) -> dict:
+            r = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+            r.raise_for_status()
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        # seeded users 1-9 of every ten are staff; admin1 is a default user
+        staff = [await token(SEED_USERNAME.format(i), SEED_PASSWORD) for i in range(1, min(6, counts["users"]))]
+        admin_name, admin_password = next((u[0], u[1]) for u in DEFAULT_USERS if u[2] == "admin")
+        ctx = Context(client, staff, await token(admin_name, admin_password), counts, ids, args.login_burst)
+        await execute(ctx, plan(args.warmup, args.seed + 1), args.concurrency, args.seed + 1)
+        ctx.samples = {name: [] for name in MIX}
+        ctx.errors = {name: 0 for name in MIX}
+        ctx.statuses = {}
+        elapsed = await execute(ctx, plan(args.requests, args.seed), args.concurrency, args.seed)
+
+    await dispose_engines()  # aiosqlite connections hold non-daemon threads
+    total = sum(len(s) for s in ctx.samples.values())
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 2),
+        "errors": sum(ctx.errors.values()),
+        "status_counts": ctx.statuses,
+        "scenarios": {
+            name: {"requests": len(samples), "errors": ctx.errors[name], "ms": percentiles(samples)}
+            for name, samples in ctx.samples.items() if samples
+        },
+    }
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.1, help="app.seed scale; 0.1 = 1k customers, 2k orders")
+    parser.add_argument("--requests", type=int, default=2000, help="scenarios to run (a login burst counts once)")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--login-burst", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the result to this file")
+    args = parser.parse_args(argv)
+
+    # the database and uploads go away with the run, unless BENCH_DATABASE_URL names another database
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["ASYNC_DATABASE_URL"] = ""  # derived from DATABASE_URL, whatever .env says
+        os.environ["UPLOAD_DIR"] = os.path.join(tmp, "uploads")
+        os.environ.setdefault("DERIVATIVES_ENABLED", "false")
+
+        from app.main import app
+        from app.core.config import DB_ASYNC
+        from app.core.derivatives import shutdown_derivatives
+        from app.core.permission_table import reload_permission_table
+        from app.core.security import shutdown_password_hasher
+        from app.db.session import SessionLocal, get_engine
+        from app.schema import create_schema
+        from app.seed import seed, sizes
+
+        if sizes(args.scale)["users"] < 2:  # run() logs in as seeded staff users, which start at seed-user-1
+            parser.error(f"--scale {args.scale} seeds fewer than 2 users; use at least 0.02")
+        create_schema()
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            added = seed(db, args.scale, args.seed, log=lambda message: None)
+            seed_seconds = time.perf_counter() - started
+            ids = id_ranges(db)
+            reload_permission_table(db)
+        finally:
+            db.close()
+
+        try:
+            result = {
+                "benchmark": "load",
+                "commit": git_commit(),
+                "database": get_engine().dialect.name,
+                "db_async": DB_ASYNC,
+                "scale": args.scale,
+                "seeded": added,
+                "seed_seconds": round(seed_seconds, 3),
+                "concurrency": args.concurrency,
+                "seed": args.seed,
+                **asyncio.run(run(app, sizes(args.scale), ids, args)),
+            }
+        finally:
+            shutdown_password_hasher()
+            shutdown_derivatives()
+        print(json.dumps(result))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
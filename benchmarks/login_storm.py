@@ -0,0 +1,102 @@
+"""Login storm: bcrypt throughput and how responsive the rest of the API stays.
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+
+Runs the app in-process (httpx ASGI transport) against a throwaway SQLite
+file, never DATABASE_URL, since it adds a user and logs in with it. While the logins run, a probe keeps
+listing customers; both latency distributions are printed as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {}
+    qs = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {"p50": round(qs[49] * 1000, 2), "p95": round(qs[94] * 1000, 2), "p99": round(qs[98] * 1000, 2)}
+
+async def storm(app, logins: int, concurrency: int) -> dict:
+    import httpx
+    from app.db.session import dispose_engines
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        creds = {"username": "storm", "password": "storm-password"}
+        token = (await client.post("/api/v1/auth/login", data=creds)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        login_times, statuses = [], {}
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one_login():
+            async with gate:
+                t = time.perf_counter()
+                r = await client.post("/api/v1/auth/login", data=creds)
+                login_times.append(time.perf_counter() - t)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        probe_times = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                t = time.perf_counter()
+                await client.get("/api/v1/customers/?limit=10", headers=headers)
+                probe_times.append(time.perf_counter() - t)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    await dispose_engines()  # aiosqlite connections hold non-daemon threads
+    return {
+        "benchmark": "login_storm",
+        "logins": logins,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(statuses.get(200, 0) / elapsed, 2),
+        "status_counts": statuses,
+        "login_ms": percentiles(login_times),
+        "probe_requests": len(probe_times),
+        "probe_ms": percentiles(probe_times),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["ASYNC_DATABASE_URL"] = ""  # derived from DATABASE_URL, whatever .env says
+        os.environ["UPLOAD_DIR"] = os.path.join(tmp, "uploads")
+
+        from app.main import app
+        from app.db.session import SessionLocal
+        from app.core.security import hash_password, shutdown_password_hasher
+        from app.models import User
+        from app.schema import create_schema
+
+        create_schema()
+        db = SessionLocal()
+        db.add(User(username="storm", password=hash_password("storm-password"), role="user"))
+        db.commit()
+        db.close()
+
+        try:
+            print(json.dumps(asyncio.run(storm(app, args.logins, args.concurrency))))
+        finally:
+            shutdown_password_hasher()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Round trips of POST /permissions/bulk as the payload grows.
+
+    python -m benchmarks.permissions_bulk --sizes 10,100,1000
+
+Runs the app in-process (httpx ASGI transport) against a throwaway SQLite
+file, never DATABASE_URL: the replace_all pass deletes every permission that
+is not in the payload, and the run needs an admin user. For each size it posts a payload of new
+endpoints, the same payload again (all updates), and a replace_all payload,
+and prints one JSON object per request with the SQL statements it issued
+(from the per-endpoint query metrics) and its wall time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+ENDPOINT = "POST /api/v1/permissions/bulk"
+
+def payload(size: int, prefix: str, groups: str, replace_all: bool = False) -> dict:
+    return {
+        "permissions": [
+            {"module": "bench", "endpoint_name": f"{prefix}-{i}", "allowed_groups": groups}
+            for i in range(size)
+        ],
+        "replace_all": replace_all,
+    }
+
+async def run(app, sizes: list, headers: dict) -> list:
+    import httpx
+    from app.db.metrics import query_stats
+    from app.db.session import dispose_engines
+
+    def statements() -> int:
+        return query_stats().get(ENDPOINT, {}).get("queries", 0)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sizes:
+            runs = [
+                ("insert", payload(size, f"bench{size}", "admin")),
+                ("update", payload(size, f"bench{size}", "admin,staff")),
+                ("replace_all", payload(size, f"bench{size}r", "admin", replace_all=True)),
+            ]
+            for mode, body in runs:
+                before = statements()
+                t = time.perf_counter()
+                r = await client.post("/api/v1/permissions/bulk", json=body, headers=headers)
+                elapsed = time.perf_counter() - t
+                r.raise_for_status()
+                results.append({
+                    "benchmark": "permissions_bulk",
+                    "size": size,
+                    "mode": mode,
+                    "statements": statements() - before,
+                    "ms": round(elapsed * 1000, 2),
+                })
+    await dispose_engines()  # aiosqlite connections hold non-daemon threads
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["ASYNC_DATABASE_URL"] = ""  # derived from DATABASE_URL, whatever .env says
+        os.environ["UPLOAD_DIR"] = os.path.join(tmp, "uploads")
+
+        from app.main import app
+        from app.db.session import SessionLocal
+        from app.core.security import create_access_token
+        from app.models import User
+        from app.schema import create_schema
+
+        create_schema()
+        db = SessionLocal()
+        admin = User(username="bench-admin", password="!", role="admin")  # never logs in; goes with the temp dir
+        db.add(admin)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': admin.username}, user=admin)}"}
+        db.close()
+
+        for result in asyncio.run(run(app, [int(s) for s in args.sizes.split(",")], headers)):
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
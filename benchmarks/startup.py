@@ -0,0 +1,76 @@
+"""Worker start-up cost: cold import, lifespan startup and first requests.
+
+    python -m benchmarks.startup --runs 5
+
+Each run is a fresh interpreter (nothing cached in-process) that imports
+app.main, runs the lifespan startup, then sends GET / and a first request
+that needs the database (a login for an unknown user, which stops before
+bcrypt). Uses DATABASE_URL, or a throwaway SQLite file when unset. Prints
+one JSON object with the median, min and max of each phase in ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+
+async def main():
+    import httpx
+    async with app.router.lifespan_context(app):
+        t2 = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/")
+            t3 = time.perf_counter()
+            r = await client.post("/api/v1/auth/login", data={"username": "nobody", "password": "x"})
+            assert r.status_code == 400, r.text
+            t4 = time.perf_counter()
+    return t2, t3, t4
+
+t2, t3, t4 = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "first_db_request_ms": (t4 - t3) * 1000,
+}))
+"""
+
+def run_once(env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", _CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        env = dict(os.environ)
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        env.setdefault("UPLOAD_DIR", os.path.join(tmp, "uploads"))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+        # the schema exists before the first run, as it would after a deploy step
+        subprocess.run([sys.executable, "-m", "app.schema", "create"], env=env, check=True, capture_output=True)
+        runs = [run_once(env) for _ in range(args.runs)]
+        result = {"benchmark": "startup", "runs": args.runs, "db_create_schema": env.get("DB_CREATE_SCHEMA", "true")}
+        for phase in runs[0]:
+            values = [r[phase] for r in runs]
+            result[phase] = {
+                "median": round(statistics.median(values), 2),
+                "min": round(min(values), 2),
+                "max": round(max(values), 2),
+            }
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+# Settings are read when app.core.config is imported, so the throwaway
+# database and upload directory are set up before anything imports the app.
+_tmp = tempfile.mkdtemp(prefix="app-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp, "uploads")
+os.environ["DERIVATIVES_ENABLED"] = "false"
+os.environ["REFRESH_TOKEN_SYNC_SECONDS"] = "0"
+os.environ["UPLOAD_SESSION_GC_INTERVAL_SECONDS"] = "0"
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+
+    with TestClient(create_app()) as c:  # the lifespan creates the schema
+        yield c
+
+@pytest.fixture(scope="session")
+def db(client):
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="session")
+def auth_headers(client, db):
+    from app.core.security import hash_password
+    from app.models import User
+
+    db.add(User(username="tester", password=hash_password("secret"), role="admin"))
+    db.commit()
+    token = client.post("/api/v1/auth/login", data={"username": "tester", "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
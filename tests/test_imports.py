@@ -0,0 +1,78 @@
+import asyncio
+import time
+import httpx
+import pytest
+
+BOUNDARY = "import-test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+@pytest.fixture(scope="module")
+def headers(db):
+    from app.core.security import create_access_token
+    from app.models import User
+
+    user = User(username="importer", password="!", role="superadmin")
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username}, user=user)}"}
+
+def _head(filename: str = "c.csv") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+        "name,email\n"
+    ).encode()
+
+def _rows(prefix: str, start: int, stop: int) -> bytes:
+    return "".join(f"{prefix}{i},{prefix}{i}@example.com\n" for i in range(start, stop)).encode()
+
+def _imported(db, prefix: str) -> int:
+    from app.models import Customer
+
+    db.expire_all()
+    count = db.query(Customer).filter(Customer.email.like(f"{prefix}%")).count()
+    db.rollback()
+    return count
+
+def test_batches_load_while_the_body_is_still_arriving(client, db, headers):
+    from app.core.config import IMPORT_BATCH_SIZE
+
+    loaded_early = []
+
+    async def body():
+        yield _head()
+        yield _rows("early", 0, IMPORT_BATCH_SIZE + 10)
+        deadline = time.monotonic() + 10
+        while _imported(db, "early") < IMPORT_BATCH_SIZE and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        loaded_early.append(_imported(db, "early"))
+        yield _rows("early", IMPORT_BATCH_SIZE + 10, IMPORT_BATCH_SIZE + 20)
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    async def post():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(
+                "/api/v1/customers/import", content=body(), headers={**headers, "Content-Type": CONTENT_TYPE}
+            )
+
+    response = asyncio.run(post())
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == IMPORT_BATCH_SIZE + 20
+    assert loaded_early == [IMPORT_BATCH_SIZE]
+
+def test_body_cut_off_inside_the_file_keeps_out_the_last_row(client, db, headers):
+    content = _head() + _rows("cut", 0, 3) + b"cut3,cut3@exa"
+    response = client.post("/api/v1/customers/import", content=content, headers={**headers, "Content-Type": CONTENT_TYPE})
+    assert response.status_code == 400
+    assert _imported(db, "cut") == 0
+
+@pytest.mark.parametrize("content, content_type, status", [
+    (b"name,email\n", "text/csv", 415),
+    (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="note"\r\n\r\nhi\r\n--{BOUNDARY}--\r\n'.encode(), CONTENT_TYPE, 422),
+    (f"--{BOUNDARY}--\r\n".encode(), CONTENT_TYPE, 400),
+])
+def test_body_without_a_file_part_is_rejected(client, headers, content, content_type, status):
+    response = client.post("/api/v1/customers/import", content=content, headers={**headers, "Content-Type": content_type})
+    assert response.status_code == status
@@ -0,0 +1,77 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROWS = 60
+
+@pytest.fixture(scope="module", autouse=True)
+def rows(db):
+    from app.models import Customer, CustomerImage, Item, ItemImage, Order, OrderDetail
+
+    items = [
+        Item(name=f"Item {i}", sku=f"SKU-{i}", price=Decimal("9.99"),
+             images=[ItemImage(image_url=f"items/{i}/{n}.jpg") for n in range(2)])
+        for i in range(ROWS)
+    ]
+    customers = [
+        Customer(name=f"Customer {i}", images=[CustomerImage(image_url=f"customers/{i}/{n}.jpg") for n in range(2)])
+        for i in range(ROWS)
+    ]
+    db.add_all(items + customers)
+    db.flush()
+    db.add_all(
+        Order(customer_id=customers[i].id, details=[
+            OrderDetail(item_id=items[(i + n) % ROWS].id, quantity=1, unit_price=Decimal("9.99")) for n in range(3)
+        ])
+        for i in range(ROWS)
+    )
+    db.commit()
+
+def _statements(client, url: str, headers: dict, status: int = 200) -> int:
+    count = 0
+
+    def tally(conn, cursor, statement, parameters, context, executemany):
+        nonlocal count
+        count += 1
+
+    event.listen(Engine, "before_cursor_execute", tally)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", tally)
+    assert response.status_code == status, response.text
+    return count
+
+# statements per list request, however many rows it returns: the caller's
+# user row (customer and item lists only check the cached security version),
+# the page, and one batched SELECT ... IN per serialized relationship
+@pytest.mark.parametrize("path, expected", [
+    ("/api/v1/customers/", 2),  # customers, customer_images
+    ("/api/v1/items/", 2),  # items, item_images
+    ("/api/v1/orders/", 4),  # users, orders, order_details, items
+])
+def test_list_statement_count_does_not_grow_with_page_size(client, auth_headers, path, expected):
+    client.get("/api/v1/customers/?limit=1", headers=auth_headers)  # caches the caller's security version
+    small = _statements(client, f"{path}?limit=5", auth_headers)
+    large = _statements(client, f"{path}?limit=55", auth_headers)
+    assert (small, large) == (expected, expected)
+
+@pytest.mark.parametrize("path", ["/api/v1/customers/?limit=7", "/api/v1/items/?limit=7"])
+def test_unchanged_page_is_revalidated_without_statements(client, auth_headers, path):
+    etag = client.get(path, headers=auth_headers).headers["etag"]
+    assert _statements(client, path, {**auth_headers, "If-None-Match": etag}, status=304) == 0
+
+@pytest.mark.parametrize("path", ["/api/v1/customers/", "/api/v1/items/", "/api/v1/orders/"])
+def test_link_header_walks_every_page(client, auth_headers, path):
+    url, seen, pages = f"{path}?limit=25", [], 0
+    while url:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        pages += 1
+        link = response.headers.get("link")
+        assert (link is None) == ("x-next-cursor" not in response.headers)
+        url = link and link[link.index("<") + 1:link.index(">")]
+    assert len(seen) == len(set(seen)) >= ROWS
+    assert pages == -(-len(seen) // 25)
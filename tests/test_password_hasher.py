@@ -0,0 +1,22 @@
+import asyncio
+import time
+
+def test_cancelled_caller_keeps_the_slot_until_the_job_ends():
+    from app.core import security
+
+    async def scenario():
+        await security._run_in_hash_pool(abs, -1)  # start a worker, so the next job runs at once
+        waiter = asyncio.create_task(security._run_in_hash_pool(time.sleep, 1))
+        await asyncio.sleep(0.2)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        held = security.password_hasher_stats()["pending"]
+        deadline = time.monotonic() + 10
+        while security.password_hasher_stats()["pending"] and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return held, security.password_hasher_stats()["pending"]
+
+    try:
+        assert asyncio.run(scenario()) == (1, 0)
+    finally:
+        security.shutdown_password_hasher()
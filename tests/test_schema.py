@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, inspect
+
+def test_upgrade_adds_columns_and_indexes_to_old_tables(tmp_path):
+    from app.db.session import Base
+    from app.schema import upgrade_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # orders and users as the first release created them
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, status VARCHAR, total NUMERIC(10, 2))")
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR, "
+                             "password VARCHAR NOT NULL, role VARCHAR NOT NULL, refresh_token VARCHAR)")
+        conn.exec_driver_sql("CREATE UNIQUE INDEX ix_users_username ON users (username)")
+        conn.exec_driver_sql("INSERT INTO orders VALUES (1, NULL, 'pending', 5)")
+        conn.exec_driver_sql("INSERT INTO users VALUES (1, 'old', NULL, 'x', 'admin', NULL)")
+        existing = set(inspect(conn).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        upgrade_schema(conn, existing)
+        inspector = inspect(conn)
+        assert "created_at" in {c["name"] for c in inspector.get_columns("orders")}
+        assert "ix_orders_created_at" in {i["name"] for i in inspector.get_indexes("orders")}
+        assert "ix_users_username" in {i["name"] for i in inspector.get_indexes("users")}
+        assert conn.exec_driver_sql("SELECT id, status, created_at IS NOT NULL FROM orders").all() == [(1, "pending", 1)]
+        assert conn.exec_driver_sql("SELECT username, security_version FROM users").all() == [("old", 0)]
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+    with engine.begin() as conn:
+        upgrade_schema(conn, existing)  # nothing left to do
+    engine.dispose()
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import pytest
+
+BOUNDARY = "upload-test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+@pytest.fixture(scope="module")
+def headers(db):
+    from app.core.security import create_access_token
+    from app.models import User
+
+    user = User(username="uploader", password="!", role="superadmin")
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username}, user=user)}"}
+
+@pytest.fixture(scope="module")
+def customer_id(db):
+    from app.models import Customer
+
+    customer = Customer(name="Upload target")
+    db.add(customer)
+    db.commit()
+    return customer.id
+
+def _part(filename: str, data: bytes) -> bytes:
+    head = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n\r\n'
+    return head.encode() + data + b"\r\n"
+
+def _incoming() -> list:
+    from app.core.config import INCOMING_SUBDIR, UPLOAD_DIR
+
+    directory = os.path.join(UPLOAD_DIR, INCOMING_SUBDIR)
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+def test_files_of_one_request_are_all_stored(client, headers, customer_id):
+    from app.core.config import UPLOAD_DIR
+
+    files = [os.urandom(size) for size in (10, 300_000, 70_000)]  # small ones share a chunk with the next
+    content = b"".join(_part(f"p{i}.jpg", data) for i, data in enumerate(files)) + f"--{BOUNDARY}--\r\n".encode()
+    response = client.post(
+        f"/api/v1/customers/{customer_id}/images/upload", content=content, headers={**headers, "Content-Type": CONTENT_TYPE}
+    )
+    assert response.status_code == 200, response.text
+    stored = {}
+    for image in response.json()["images"]:
+        with open(os.path.join(UPLOAD_DIR, image["image_url"]), "rb") as f:
+            stored[hashlib.sha256(f.read()).hexdigest()] = image["image_url"]
+    assert set(stored) == {hashlib.sha256(data).hexdigest() for data in files}
+    assert _incoming() == []
+
+@pytest.mark.parametrize("content, status", [
+    (_part("cut.jpg", os.urandom(100_000))[:-40], 400),  # ends inside the file
+    (f"--{BOUNDARY}--\r\n".encode(), 400),  # malformed
+])
+def test_rejected_body_leaves_no_files(client, headers, customer_id, content, status):
+    response = client.post(
+        f"/api/v1/customers/{customer_id}/images/upload", content=content, headers={**headers, "Content-Type": CONTENT_TYPE}
+    )
+    assert response.status_code == status
+    assert _incoming() == []